@@ -0,0 +1,66 @@
+"""
+Compare the greedy trie walk of URIPathRouter with the backtracking engine.
+
+Most requests never need to backtrack, so the two engines should be close on
+unambiguous routes; ambiguous requests only match with backtracking.
+
+Run from the repository root:
+    python benchmarks/backtracking.py [--routes 5000] [--repeat 5]
+"""
+
+import argparse
+import random
+import timeit
+
+from pyger.routers import URIPathRouter
+
+
+def generate_routes(count):
+    routes = []
+    for i in range(count):
+        routes.append('/service{0}/{{id:\\d+}}/history'.format(i))
+        routes.append('/service{0}/{{slug}}/edit'.format(i))
+    return routes
+
+
+def build(routes, engine):
+    router = URIPathRouter(engine=engine)
+    for i, route in enumerate(routes):
+        router.connect(i, path=route)
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--routes', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    routes = generate_routes(args.routes)
+    rng = random.Random(0)
+    services = [rng.randrange(args.routes) for _ in range(args.requests)]
+    workloads = {
+        'direct': ['/service{0}/12/history'.format(i) for i in services],
+        'ambiguous': ['/service{0}/12/edit'.format(i) for i in services],
+    }
+
+    for engine in (None, 'backtracking'):
+        match = build(routes, engine).match
+        for name, paths in workloads.items():
+            try:
+                match(path=paths[0])
+            except Exception:
+                print('{:>12} {:>9}: no match'.format(engine or 'greedy', name))
+                continue
+            timings = timeit.repeat(
+                lambda: [match(path=path) for path in paths],
+                number=1, repeat=args.repeat
+            )
+            print('{:>12} {:>9}: {:.2f} us/match'.format(
+                engine or 'greedy', name, min(timings) / len(paths) * 1e6
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare two result files written by `suite.py`.
+
+Every metric is a time or a size, so lower is better. Exits with status 1 if
+any metric got worse by more than the threshold.
+
+Run from the repository root:
+    python benchmarks/compare.py before.json after.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    with open(path) as fp:
+        return json.load(fp)
+
+
+def compare(before, after, threshold):
+    """
+    Returns:
+        A list of (metric, before, after, change) tuples for metrics found in
+        both results, and the list of metrics which regressed.
+    """
+    rows = []
+    regressions = []
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        change = (new - old) / old if old else 0.0
+        rows.append((key, old, new, change))
+        if change > threshold:
+            regressions.append(key)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as a regression (default: 0.1)')
+    args = parser.parse_args()
+
+    before, after = load_results(args.before), load_results(args.after)
+    print('{} -> {}'.format(before['meta'].get('revision'), after['meta'].get('revision')))
+    rows, regressions = compare(before['results'], after['results'], args.threshold)
+    for key, old, new, change in rows:
+        flag = ' !' if key in regressions else ''
+        print('{:<56} {:>12.1f} {:>12.1f} {:>+8.1%}{}'.format(key, old, new, change, flag))
+
+    if regressions:
+        print('{} metric(s) regressed by more than {:.0%}'.format(
+            len(regressions), args.threshold
+        ))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
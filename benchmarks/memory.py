@@ -0,0 +1,72 @@
+"""
+Report the memory used per route by URIPathRouter route tables.
+
+Run from the repository root:
+    python benchmarks/memory.py [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from pyger.routers import URIPathRouter
+from pyger.routers.flat import flatten
+
+
+def generate_routes(count):
+    shapes = (
+        '/service{0}/v1/items',
+        '/service{0}/objects/{{id:\\d+}}/details',
+        '/service{0}/users/{{user}}/profile/settings',
+        '/service{0}/static/{{*path}}',
+    )
+    return [shapes[i % len(shapes)].format(i) for i in range(count)]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        built = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, built
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print('{:>8} {:>16} {:>21} {:>14}'.format(
+        'routes', 'connect B/route', 'connect_many B/route', 'flat B/route'
+    ))
+    for size in args.sizes:
+        routes = generate_routes(size)
+        handlers = list(range(size))
+
+        def build_connect():
+            router = URIPathRouter()
+            for handler, route in zip(handlers, routes):
+                router.connect(handler, path=route)
+            return router
+
+        def build_connect_many():
+            router = URIPathRouter()
+            router.connect_many(
+                (handler, {'path': route}) for handler, route in zip(handlers, routes)
+            )
+            return router
+
+        connect_bytes, _ = measure(build_connect)
+        connect_many_bytes, router = measure(build_connect_many)
+        flat_bytes, _ = measure(lambda: flatten(router))
+        print('{:>8} {:>16.1f} {:>21.1f} {:>14.1f}'.format(
+            size, connect_bytes / size, connect_many_bytes / size, flat_bytes / size
+        ))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Time misses of a small URIPathRouter -> HTTPMethodRouter tree: paths without a
+route (404) and methods without a route (405), through `match`, which raises,
+and through `try_match` where it exists.
+
+Misses are most of the traffic of a 404 or 405 storm. The script only uses
+APIs available since the first release, so it can be run on two commits to
+compare them.
+
+Run from the repository root:
+    python benchmarks/misses.py [--repeat 7] [--number 20000]
+"""
+
+import argparse
+import timeit
+
+from pyger.base import MatchError
+from pyger.routers import HTTPMethodRouter, URIPathRouter
+
+
+def build_tree():
+    router = URIPathRouter()
+    for resource in ('users', 'articles', 'comments', 'tags'):
+        methods = HTTPMethodRouter()
+        methods.connect('list_' + resource, method='GET')
+        methods.connect('create_' + resource, method='POST')
+        router.connect(methods, path='/' + resource + '-all')
+        methods = HTTPMethodRouter()
+        methods.connect('get_' + resource, method='GET')
+        router.connect(methods, path='/' + resource + '/{id:[0-9]+}')
+    return router
+
+
+def raising(router, kwargs):
+    match = router.match
+
+    def run():
+        try:
+            match(**kwargs)
+        except MatchError:
+            pass
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    router = build_tree()
+    workloads = [
+        ('404 no_segment', {'path': '/missing', 'method': 'GET'}),
+        ('404 partial_path', {'path': '/users', 'method': 'GET'}),
+        ('405 method', {'path': '/users/12', 'method': 'DELETE'}),
+    ]
+    for name, kwargs in workloads:
+        runs = [('match', raising(router, kwargs))]
+        if hasattr(router, 'try_match'):
+            runs.append(('try_match', lambda kwargs=kwargs: router.try_match(**kwargs)))
+        for api, run in runs:
+            timings = timeit.repeat(run, number=args.number, repeat=args.repeat)
+            print('{:>17} {:>9}: {:.2f} us'.format(
+                name, api, min(timings) / args.number * 1e6
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Measure matching before and after `URIPathRouter.optimize` on a node with many
+disjoint parameterized siblings, where traffic mostly hits the last one.
+
+Run from the repository root:
+    python benchmarks/optimize.py [--siblings 12] [--repeat 5]
+"""
+
+import argparse
+import random
+import timeit
+
+from pyger.routers import URIPathRouter
+
+
+def build(siblings):
+    router = URIPathRouter()
+    for i in range(siblings):
+        # patterns differ in length, so they are provably disjoint
+        router.connect(i, path='/codes/{{code{0}:[0-9a-z]{{{1}}}$}}/details'.format(i, i + 4))
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--siblings', type=int, default=12)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    hot = 'x' * (args.siblings + 3)
+    paths = [
+        '/codes/{}/details'.format(hot if rng.random() < 0.9 else 'y' * rng.randrange(4, 8))
+        for _ in range(args.requests)
+    ]
+
+    router = build(args.siblings)
+    for label in ('registration order', 'optimized'):
+        if label == 'optimized':
+            print('reordered nodes:', router.optimize(paths[:1000]))
+        match = router.match
+        for path in paths:  # warm up
+            match(path=path)
+        timings = timeit.repeat(
+            lambda: [match(path=path) for path in paths], number=1, repeat=args.repeat
+        )
+        print('{:>20}: {:.2f} us/match'.format(label, min(timings) / len(paths) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Synthetic route tables for the benchmark suite.
+
+Each generator returns a list of `Route` tuples: a route template as passed to
+`URIPathRouter.connect`, the HTTP methods served by the route and a request
+path which the route matches.
+"""
+
+from collections import namedtuple
+
+
+Route = namedtuple('Route', ['template', 'methods', 'path'])
+
+
+SAMPLE_VALUES = {
+    'owner': 'octocat', 'repo': 'hello-world', 'org': 'github', 'username': 'mona',
+    'team_slug': 'core', 'number': '1347', 'issue_number': '42', 'pull_number': '7',
+    'comment_id': '1001', 'sha': '6dcb09b5b57875f334f61aebed695e2e4193db5e',
+    'ref': 'heads-main', 'branch': 'main', 'tag': 'v1.0.0', 'release_id': '55',
+    'asset_id': '3', 'hook_id': '12', 'run_id': '30433642', 'job_id': '399444496',
+    'workflow_id': 'ci.yml', 'gist_id': 'aa5a315d61ae9438b18d', 'name': 'bug',
+    'id': '12', 'version': 'v12', 'date': '2016-12-26', 'uuid': '1b4e28ba-2fa1',
+    'file': 'report.json', 'slug': 'some-article', 'path': 'css/site.css',
+    'key': 'a/b/c.txt', 'bucket': 'assets',
+}
+
+
+def sample_path(template, values=SAMPLE_VALUES):
+    """
+    Fill in the parameterized segments of a route template with sample values.
+
+    Patterns may not end in a `{m,n}` quantifier, since route parsing strips
+    braces from both ends of a segment; these tables end such patterns in `$`.
+    """
+    segments = []
+    for segment in template.split('/'):
+        if segment.startswith('{'):
+            name = segment.strip('{}').split(':', 1)[0]
+            if name.startswith('*'):
+                segment = values.get(name[1:], 'a/b/c')
+            else:
+                segment = values[name]
+        segments.append(segment)
+    return '/'.join(segments)
+
+
+_GITHUB_ROUTES = (
+    ('/user', 'GET PATCH'),
+    ('/user/repos', 'GET POST'),
+    ('/user/orgs', 'GET'),
+    ('/users/{username}', 'GET'),
+    ('/users/{username}/repos', 'GET'),
+    ('/users/{username}/gists', 'GET'),
+    ('/users/{username}/followers', 'GET'),
+    ('/orgs/{org}', 'GET PATCH'),
+    ('/orgs/{org}/repos', 'GET POST'),
+    ('/orgs/{org}/members', 'GET'),
+    ('/orgs/{org}/members/{username}', 'GET DELETE'),
+    ('/orgs/{org}/teams', 'GET POST'),
+    ('/orgs/{org}/teams/{team_slug}', 'GET PATCH DELETE'),
+    ('/orgs/{org}/teams/{team_slug}/members', 'GET'),
+    ('/orgs/{org}/hooks', 'GET POST'),
+    ('/orgs/{org}/hooks/{hook_id:\\d+}', 'GET PATCH DELETE'),
+    ('/repos/{owner}/{repo}', 'GET PATCH DELETE'),
+    ('/repos/{owner}/{repo}/issues', 'GET POST'),
+    ('/repos/{owner}/{repo}/issues/{issue_number:\\d+}', 'GET PATCH'),
+    ('/repos/{owner}/{repo}/issues/{issue_number:\\d+}/comments', 'GET POST'),
+    ('/repos/{owner}/{repo}/issues/{issue_number:\\d+}/labels', 'GET POST PUT DELETE'),
+    ('/repos/{owner}/{repo}/issues/{issue_number:\\d+}/labels/{name}', 'DELETE'),
+    ('/repos/{owner}/{repo}/issues/comments/{comment_id:\\d+}', 'GET PATCH DELETE'),
+    ('/repos/{owner}/{repo}/pulls', 'GET POST'),
+    ('/repos/{owner}/{repo}/pulls/{pull_number:\\d+}', 'GET PATCH'),
+    ('/repos/{owner}/{repo}/pulls/{pull_number:\\d+}/files', 'GET'),
+    ('/repos/{owner}/{repo}/pulls/{pull_number:\\d+}/merge', 'GET PUT'),
+    ('/repos/{owner}/{repo}/pulls/{pull_number:\\d+}/reviews', 'GET POST'),
+    ('/repos/{owner}/{repo}/commits', 'GET'),
+    ('/repos/{owner}/{repo}/commits/{sha:[0-9a-f]{40}$}', 'GET'),
+    ('/repos/{owner}/{repo}/commits/{sha:[0-9a-f]{40}$}/comments', 'GET POST'),
+    ('/repos/{owner}/{repo}/branches', 'GET'),
+    ('/repos/{owner}/{repo}/branches/{branch}', 'GET'),
+    ('/repos/{owner}/{repo}/branches/{branch}/protection', 'GET PUT DELETE'),
+    ('/repos/{owner}/{repo}/git/refs/{ref}', 'GET PATCH DELETE'),
+    ('/repos/{owner}/{repo}/git/commits/{sha:[0-9a-f]{40}$}', 'GET'),
+    ('/repos/{owner}/{repo}/git/trees/{sha:[0-9a-f]{40}$}', 'GET'),
+    ('/repos/{owner}/{repo}/contents/{*path}', 'GET PUT DELETE'),
+    ('/repos/{owner}/{repo}/releases', 'GET POST'),
+    ('/repos/{owner}/{repo}/releases/latest', 'GET'),
+    ('/repos/{owner}/{repo}/releases/tags/{tag}', 'GET'),
+    ('/repos/{owner}/{repo}/releases/{release_id:\\d+}', 'GET PATCH DELETE'),
+    ('/repos/{owner}/{repo}/releases/{release_id:\\d+}/assets', 'GET'),
+    ('/repos/{owner}/{repo}/releases/assets/{asset_id:\\d+}', 'GET PATCH DELETE'),
+    ('/repos/{owner}/{repo}/hooks', 'GET POST'),
+    ('/repos/{owner}/{repo}/hooks/{hook_id:\\d+}', 'GET PATCH DELETE'),
+    ('/repos/{owner}/{repo}/actions/runs', 'GET'),
+    ('/repos/{owner}/{repo}/actions/runs/{run_id:\\d+}', 'GET DELETE'),
+    ('/repos/{owner}/{repo}/actions/runs/{run_id:\\d+}/jobs', 'GET'),
+    ('/repos/{owner}/{repo}/actions/jobs/{job_id:\\d+}', 'GET'),
+    ('/repos/{owner}/{repo}/actions/workflows/{workflow_id}', 'GET'),
+    ('/repos/{owner}/{repo}/actions/workflows/{workflow_id}/runs', 'GET'),
+    ('/gists', 'GET POST'),
+    ('/gists/public', 'GET'),
+    ('/gists/{gist_id}', 'GET PATCH DELETE'),
+    ('/gists/{gist_id}/comments', 'GET POST'),
+    ('/search/repositories', 'GET'),
+    ('/search/issues', 'GET'),
+    ('/rate_limit', 'GET'),
+)
+
+
+def github_routes(count=None):
+    """
+    A fixed table shaped like the GitHub REST API; `count` is ignored.
+    """
+    return [
+        Route(template, tuple(methods.split()), sample_path(template))
+        for template, methods in _GITHUB_ROUTES
+    ]
+
+
+def deep_rest_routes(count):
+    """
+    Nested collection routes, six to nine segments deep.
+    """
+    routes = []
+    for i in range(count):
+        template = (
+            '/api/v1/org{0}/{{org_id:\\d+}}/teams/{{team_id:\\d+}}/projects/{{id}}'
+        ).format(i // 8)
+        template += ('', '/tasks', '/tasks/{number:\\d+}', '/tasks/{number:\\d+}/comments',
+                     '/members', '/members/{username}', '/settings', '/hooks/{hook_id:\\d+}')[i % 8]
+        values = dict(SAMPLE_VALUES, org_id='7', team_id='3')
+        routes.append(Route(template, ('GET', 'POST'), sample_path(template, values)))
+    return routes
+
+
+def regex_heavy_routes(count):
+    """
+    Nodes with several parameterized siblings which each have their own pattern.
+    """
+    shapes = (
+        '/r{0}/{{version:v\\d+}}',
+        '/r{0}/{{date:\\d{{4}}-\\d\\d-\\d\\d}}',
+        '/r{0}/{{uuid:[0-9a-f]{{8}}-[0-9a-f]{{4}}$}}',
+        '/r{0}/{{file:.+\\.json}}',
+        '/r{0}/{{slug:[a-z]+(?:-[a-z]+)+}}',
+    )
+    routes = []
+    for i in range(count):
+        template = shapes[i % len(shapes)].format(i // len(shapes))
+        routes.append(Route(template, ('GET',), sample_path(template)))
+    return routes
+
+
+def glob_heavy_routes(count):
+    """
+    Routes ending in remainder (`{*rest}`) segments at several depths.
+    """
+    shapes = (
+        '/static{0}/{{*path}}',
+        '/files{0}/{{bucket}}/{{*key}}',
+        '/mirror{0}/{{owner}}/{{repo}}/raw/{{*path}}',
+    )
+    routes = []
+    for i in range(count):
+        template = shapes[i % len(shapes)].format(i)
+        routes.append(Route(template, ('GET',), sample_path(template)))
+    return routes
+
+
+TABLES = {
+    'github': github_routes,
+    'deep_rest': deep_rest_routes,
+    'regex_heavy': regex_heavy_routes,
+    'glob_heavy': glob_heavy_routes,
+}
@@ -0,0 +1,209 @@
+"""
+Benchmark URIPathRouter route tables and nested method routing trees.
+
+For each synthetic route table (see `route_tables.py`) this measures the time
+to build the router, the latency percentiles of matching and missing paths
+with every lookup engine, a URIPathRouter -> HTTPMethodRouter tree, and the
+memory used per route. Results are written as JSON so runs on two commits can
+be compared with `compare.py`.
+
+Run from the repository root:
+    python benchmarks/suite.py [--output results.json] [--quick]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from pyger.base import MatchError
+from pyger.instrument import perf_counter_ns
+from pyger.routers import HTTPMethodRouter, URIPathRouter
+
+from route_tables import TABLES
+
+
+def build_path_router(routes, engine=None):
+    router = URIPathRouter(engine=engine)
+    router.connect_many((i, {'path': route.template}) for i, route in enumerate(routes))
+    return router
+
+
+def build_method_tree(routes):
+    router = URIPathRouter()
+    for i, route in enumerate(routes):
+        method_router = HTTPMethodRouter()
+        for method in route.methods:
+            method_router.connect((i, method), method=method)
+        router.connect(method_router, path=route.template)
+    return router
+
+
+def miss_paths(router, routes):
+    # paths which share a prefix with a route but do not match, and paths
+    # which fail on their first segment
+    paths = []
+    for route in routes:
+        for path in (route.path + '/_missing/_tail', '/_missing' + route.path):
+            try:
+                router.match(path=path)
+            except MatchError:
+                paths.append(path)
+    return paths
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    last = len(samples) - 1
+    return {
+        'p50_ns': samples[last * 50 // 100],
+        'p90_ns': samples[last * 90 // 100],
+        'p99_ns': samples[last * 99 // 100],
+        'mean_ns': sum(samples) // len(samples),
+    }
+
+
+def match_latencies(router, requests, rounds):
+    match = router.match
+    timer = perf_counter_ns
+    samples = []
+    for kwargs in requests:  # warm up lazily built lookups
+        try:
+            match(**kwargs)
+        except MatchError:
+            pass
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            for kwargs in requests:
+                start = timer()
+                try:
+                    match(**kwargs)
+                except MatchError:
+                    pass
+                samples.append(timer() - start)
+    finally:
+        gc.enable()
+    return percentiles(samples)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def traced_bytes(function):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def sample_requests(paths, count, rng, **extra):
+    return [dict(extra, path=rng.choice(paths)) for _ in range(count)]
+
+
+def run_table(name, routes, args, rng):
+    results = {}
+    count = len(routes)
+
+    def connect_each():
+        router = URIPathRouter()
+        for i, route in enumerate(routes):
+            router.connect(i, path=route.template)
+        return router
+
+    seconds, _ = timed(connect_each)
+    results['build.connect_us_per_route'] = seconds / count * 1e6
+    seconds, router = timed(lambda: build_path_router(routes))
+    results['build.connect_many_us_per_route'] = seconds / count * 1e6
+    memory, _ = traced_bytes(lambda: build_path_router(routes))
+    results['memory.bytes_per_route'] = memory / count
+
+    hits = sample_requests([route.path for route in routes], args.requests, rng)
+    misses = sample_requests(miss_paths(router, routes), args.requests, rng)
+    for engine in URIPathRouter.engines:
+        engine_router = build_path_router(routes, engine)
+        label = engine or 'walk'
+        for kind, requests in (('hit', hits), ('miss', misses)):
+            for key, value in match_latencies(engine_router, requests, args.rounds).items():
+                results['match.{}.{}.{}'.format(label, kind, key)] = value
+
+    tree = build_method_tree(routes)
+    method_hits = []
+    method_misses = []
+    for route in routes:
+        method_hits.extend({'path': route.path, 'method': method} for method in route.methods)
+        if 'PUT' not in route.methods:
+            method_misses.append({'path': route.path, 'method': 'PUT'})
+    for kind, requests in (('hit', method_hits), ('method_miss', method_misses)):
+        if not requests:
+            continue
+        requests = [rng.choice(requests) for _ in range(args.requests)]
+        for key, value in match_latencies(tree, requests, args.rounds).items():
+            results['nested.{}.{}'.format(kind, key)] = value
+
+    return {'{}.{}'.format(name, key): value for key, value in results.items()}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--tables', nargs='+', choices=sorted(TABLES), default=sorted(TABLES))
+    parser.add_argument('--routes', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--quick', action='store_true',
+                        help='use fewer routes, requests and rounds')
+    args = parser.parse_args()
+    if args.quick:
+        args.routes, args.requests, args.rounds = 200, 300, 2
+
+    rng = random.Random(0)
+    results = {}
+    for name in args.tables:
+        routes = TABLES[name](args.routes)
+        table_results = run_table(name, routes, args, rng)
+        results.update(table_results)
+        for key, value in sorted(table_results.items()):
+            print('{:<56} {:>12.1f}'.format(key, value))
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'arguments': vars(args),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,7 +14,7 @@ from aiohttp import web, abc
 from aiohttp.web_urldispatcher import MatchInfoError, UrlMappingMatchInfo, ResourceRoute
 from aiohttp.web_exceptions import HTTPMethodNotAllowed, HTTPNotFound
 from pyger.routers import URIPathRouter, HTTPMethodRouter
-from pyger.base import MatchError
+from pyger.routers.http_methods import AllowedMethods
 
 
 async def hello_v1(request):
@@ -29,26 +29,34 @@ async def hello_v2(request):
     return web.Response(text=payload)
 
 
+def options_handler(allowed):
+    async def options(request):
+        return web.Response(headers={'Allow': allowed.allow})
+    return options
+
+
 class PygerRouter(abc.AbstractRouter):
     def __init__(self):
-        self.routes = URIPathRouter(raises=HTTPNotFound)
+        self.routes = URIPathRouter()
 
     def add_route(self, method, path, handler):
-        method_router = HTTPMethodRouter()  # raises default MatchError
+        # GET routes also serve HEAD; OPTIONS is answered from the allowed methods
+        method_router = HTTPMethodRouter(implicit_head=True, implicit_options=True)
         method_router.connect(handler, method=method)
         self.routes.connect(method_router, path=path)
 
     async def resolve(self, request):
-        try:
-            match = self.routes.match(path=request.path, method=request.method)
-        except Exception as err:
-            if isinstance(err, MatchError):  # the HTTPMethodRouter raised an error
-                method_key = err._pyger['router'].method_key
-                method = err._pyger['kwargs'][method_key]
-                allowed_methods = err._pyger['router'].keys()
-                err = HTTPMethodNotAllowed(method, allowed_methods)
+        match = self.routes.try_match(path=request.path, method=request.method)
+        if not match:
+            if match.reason == 'method_not_allowed':  # the HTTPMethodRouter missed
+                err = HTTPMethodNotAllowed(request.method, match.router.allowed)
+            else:
+                err = HTTPNotFound()
             return MatchInfoError(err)
-        route = ResourceRoute(request.method, match.target, match)
+        handler = match.target
+        if isinstance(handler, AllowedMethods):
+            handler = options_handler(handler)
+        route = ResourceRoute(request.method, handler, match)
         return UrlMappingMatchInfo(match.match_info, route)
 
 
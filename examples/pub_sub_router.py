@@ -1,9 +1,11 @@
 """
-Example of a router for handling pub/sub messages.
+Example of a router for handling pub/sub messages, fed from a stream of requests.
 """
 
 from pyger.base import AbstractRouter
+from pyger.stream import route
 from enum import Enum
+import traceback
 
 
 class PubSubRouter(AbstractRouter):
@@ -12,6 +14,7 @@ class PubSubRouter(AbstractRouter):
 
     def connect(self, handler, command=None):
         self.map[command] = handler
+        self._routes_changed()
 
     def _resolve(self, match_info, **kwargs):
         command_type = kwargs['request']['command']
@@ -50,9 +53,19 @@ def parse_request(message):
     }
 
 
-def main():
-    import traceback
+def read_requests():
+    while True:
+        try:
+            raw_request = input('>>> ')
+        except EOFError:
+            return
+        try:
+            yield parse_request(raw_request)
+        except Exception:
+            traceback.print_exc()
 
+
+def main():
     router = PubSubRouter()
     router.connect(do_subscribe, command=MessageType.subscribe)
     router.connect(do_unsubscribe, command=MessageType.unsubscribe)
@@ -73,14 +86,19 @@ def main():
 
     print(info)
 
-    while True:
+    # a buffer of one request keeps the prompt interactive; a queue consumer
+    # would use a larger buffer to match messages in batches
+    requests = route(
+        router, read_requests(), buffer_size=1, get_kwargs=lambda request: {'request': request}
+    )
+    for request, result in requests:
+        if isinstance(result, Exception):
+            print('No handler for request: %r' % result)
+            continue
+        handler, _ = result
         try:
-            raw_request = input('>>> ')
-            request = parse_request(raw_request)
-            handler, _ = router.match(request=request)
             handler(request)
-
-        except Exception as err:
+        except Exception:
             traceback.print_exc()
 
 
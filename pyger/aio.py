@@ -0,0 +1,150 @@
+"""
+Asynchronous routing.
+
+Routing trees which contain `AsyncAbstractRouter` nodes are matched with
+`amatch`. Synchronous routers in the same tree are resolved inline, without
+yielding to the event loop.
+"""
+
+from functools import wraps
+from weakref import WeakKeyDictionary
+import asyncio
+
+from pyger.base import AbstractRouter, RouteMatch
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # Python < 3.7
+    ContextVar = None
+
+
+class _TaskVar:
+    """
+    A stand-in for `contextvars.ContextVar` which keeps a value per task.
+
+    Unlike a context variable, the value is not inherited by tasks created
+    while it is set, so lookups which `memoize` schedules as tasks are not
+    themselves memoized.
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self._default = default
+        self._values = WeakKeyDictionary()
+
+    def get(self):
+        task = asyncio.Task.current_task()
+        if task is None:
+            return self._default
+        return self._values.get(task, self._default)
+
+    def set(self, value):
+        task = asyncio.Task.current_task()
+        token = self._values.get(task, self._default)
+        self._values[task] = value
+        return token
+
+    def reset(self, token):
+        self._values[asyncio.Task.current_task()] = token
+
+
+_match_memo = (ContextVar or _TaskVar)('pyger_match_memo', default=None)
+
+
+class AsyncAbstractRouter(AbstractRouter):
+    """
+    A router whose `_resolve` method is a coroutine function.
+
+    Implementations define `async def _resolve(self, match_info, **kwargs)` and
+    may override `async def _resolve_into(self, match_info, kwargs)`, with the
+    same contracts as the synchronous methods of `AbstractRouter`.
+    """
+
+    def match(self, _match_info=None, **kwargs):
+        raise TypeError(
+            '{} resolves asynchronously; '
+            'use `amatch` instead of `match`'.format(self.__class__.__name__)
+        )
+
+    def try_match(self, _match_info=None, **kwargs):
+        raise TypeError(
+            '{} resolves asynchronously; '
+            'use `amatch` instead of `try_match`'.format(
+                self.__class__.__name__
+            )
+        )
+
+    async def amatch(self, _match_info=None, **kwargs):
+        return await amatch(self, _match_info=_match_info, **kwargs)
+
+    async def _resolve_into(self, match_info, kwargs):
+        handler, updated_match_info = await self._resolve(match_info, **kwargs)
+        if updated_match_info is not match_info:
+            match_info.clear()
+            match_info.update(updated_match_info)
+        return handler
+
+
+async def amatch(router, _match_info=None, **kwargs):
+    """
+    Match arguments against a routing tree which may contain asynchronous
+    routers.
+
+    Args:
+        router (AbstractRouter): the root of the routing tree.
+
+        match_info (Dict[str, Any]): Collected data from resolvers in the
+        routing tree. Used to gather artifacts of routing.
+
+        **kwargs: Any arguments used to resolve route.
+
+    Returns:
+        RouteMatch
+    """
+    match_info = {} if _match_info is None else _match_info.copy()
+    token = _match_memo.set({})
+    try:
+        handler = router
+        while isinstance(handler, AbstractRouter):
+            if (type(handler).match is not AbstractRouter.match and
+                    not isinstance(handler, AsyncAbstractRouter)):
+                return handler.match(_match_info=match_info, **kwargs)
+            if isinstance(handler, AsyncAbstractRouter):
+                handler = await handler._resolve_into(match_info, kwargs)
+            else:
+                handler = handler._resolve_into(match_info, kwargs)
+        return RouteMatch(target=handler, match_info=match_info)
+    finally:
+        _match_memo.reset(token)
+
+
+def memoize(func):
+    """
+    Await a coroutine function at most once per set of arguments within a
+    match.
+
+    Use this for asynchronous lookups that several routers of a tree depend on,
+    such as loading a session. Outside of `amatch` the function is called as
+    usual.
+
+    Args:
+        func (Callable[..., Awaitable]): a coroutine function with hashable
+        arguments.
+
+    Returns:
+        The wrapped coroutine function.
+    """
+    @wraps(func)
+    async def memoized(*args, **kwargs):
+        memo = _match_memo.get()
+        if memo is None:
+            return await func(*args, **kwargs)
+        try:
+            key = (func, args, frozenset(kwargs.items()))
+            future = memo.get(key)
+        except TypeError:  # unhashable argument
+            return await func(*args, **kwargs)
+        if future is None:
+            future = memo[key] = asyncio.ensure_future(func(*args, **kwargs))
+        return await future
+    return memoized
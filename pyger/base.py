@@ -1,19 +1,112 @@
 from abc import ABCMeta, abstractmethod
 from collections import namedtuple
+from pyger.cache import MatchCache
+from pyger.instrument import Instrumentation
 
 
 RouteMatch = namedtuple('RouteMatch', ['target', 'match_info'])
 
 
 class MatchError(LookupError):
-    pass
+    """
+    Raised when no route matches.
+
+    The `_pyger` attribute holds a dict of routing context (the router which
+    raised the error, its keyword arguments and a miss reason), which is built
+    when it is first read.
+    """
+
+    def __getattr__(self, name):
+        if name != '_pyger' or '_pyger_context' not in self.__dict__:
+            raise AttributeError(name)
+        router, extra = self.__dict__.pop('_pyger_context')
+        extra['router'] = router
+        self._pyger = extra
+        return extra
+
+
+class Miss:
+    """
+    The result of `AbstractRouter.try_match` when no route matches.
+
+    Misses are falsy. The exception `match` would have raised, and its `_pyger`
+    context, are only built when requested.
+
+    Args:
+        router (AbstractRouter): the router which found no route.
+
+        kwargs (Dict[str, Any]): the keyword arguments of the match.
+
+        reason (str, optional): why no route matched, e.g. "no_segment".
+
+        **extra: any further routing context.
+    """
+    __slots__ = ('router', 'kwargs', 'reason', 'extra', '_exception')
+
+    def __init__(self, router, kwargs, reason=None, **extra):
+        self.router = router
+        self.kwargs = kwargs
+        self.reason = reason
+        self.extra = extra
+        self._exception = None
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'Miss(router={!r}, reason={!r})'.format(
+            self.router, self.reason
+        )
+
+    @classmethod
+    def from_exception(cls, exc, router, kwargs):
+        """
+        Wrap an exception raised by a router's `_resolve_into`.
+        """
+        context = getattr(exc, '_pyger', {})
+        miss = cls(
+            context.get('router', router), kwargs, context.get('reason')
+        )
+        miss._exception = exc
+        return miss
+
+    def exception(self):
+        """
+        Get the exception which `match` would have raised.
+        """
+        if self._exception is None:
+            extra = dict(self.extra, kwargs=self.kwargs)
+            if self.reason is not None:
+                extra['reason'] = self.reason
+            self._exception = self.router._build_exception(**extra)
+        return self._exception
+
+
+class _MissReason:
+    # Returned in place of a handler by the lookups of built-in routers which
+    # found no route, so `_resolve_into` can raise without building a `Miss`.
+    __slots__ = ('reason',)
+
+    def __init__(self, reason):
+        self.reason = reason
 
 
 class AbstractRouter(metaclass=ABCMeta):
     """
     A router implementation exposes a public API consisting of at least the methods
     `connect` and `match`.
+
+    Implementations of `connect` should call `_routes_changed` so that match
+    caches anywhere in a routing tree are invalidated.
+
+    Attributes:
+        _routes_version (int): a counter of changes to this router's routes.
     """
+    _routes_version = 0
+    exc_class = MatchError
+    _match_cache = None
+    _instrumentation = None
+
     def __init__(self, raises=MatchError):
         self.exc_class = raises
 
@@ -32,12 +125,25 @@ class AbstractRouter(metaclass=ABCMeta):
             Anything.
         """
 
+    def connect_many(self, routes):
+        """
+        Register several routes.
+
+        Args:
+            routes (Iterable[Tuple[Any, Dict[str, Any]]]): (handler, kwargs)
+            pairs, where kwargs are the keyword arguments `connect` takes.
+        """
+        for handler, kwargs in routes:
+            self.connect(handler, **kwargs)
+
     def match(self, _match_info=None, **kwargs):
         """
         Match arguments against the router.
 
-        If the matched handler is itself a router node, that node's match method
-        is invoked with the updated match_info dict and keyword arguments.
+        If the matched handler is itself a router node, matching continues at
+        that node with the updated match_info dict and keyword arguments.
+        Nested nodes are resolved in a loop rather than through recursive
+        `match` calls, unless a node overrides `match`.
 
         Args:
             match_info (Dict[str, Any]): Collected data from resvolvers in the
@@ -51,11 +157,192 @@ class AbstractRouter(metaclass=ABCMeta):
         Raises:
             yes
         """
-        match_info = {} if _match_info is None else _match_info
-        handler, updated_match_info = self._resolve(match_info, **kwargs)
-        if isinstance(handler, AbstractRouter):
-            return handler.match(_match_info=updated_match_info, **kwargs)
-        return RouteMatch(target=handler, match_info=updated_match_info)
+        if self._instrumentation is not None:
+            match_info = {} if _match_info is None else _match_info.copy()
+            return self._instrumented_dispatch(
+                self._instrumentation, match_info, kwargs
+            )
+        cache = self._match_cache
+        if cache is not None and _match_info is None:
+            return self._cached_match(cache, kwargs)
+        match_info = {} if _match_info is None else _match_info.copy()
+        return self._dispatch(match_info, kwargs)
+
+    def try_match(self, _match_info=None, **kwargs):
+        """
+        Match arguments against the router without raising when no route
+        matches.
+
+        Built-in routers report misses without building or raising an
+        exception. Match caches and instrumentation are not used.
+
+        Args:
+            **kwargs: Any arguments used to resolve route.
+
+        Returns:
+            Union[RouteMatch, Miss]: a `Miss`, which is falsy, if no route
+            matches. Errors other than misses, such as missing arguments, are
+            raised.
+        """
+        match_info = {} if _match_info is None else _match_info.copy()
+        handler = self
+        while isinstance(handler, AbstractRouter):
+            if (handler is not self and
+                    type(handler).match is not AbstractRouter.match):
+                try:
+                    return handler.match(_match_info=match_info, **kwargs)
+                except handler.exc_class as err:
+                    return Miss.from_exception(err, handler, kwargs)
+            handler = handler._try_resolve_into(match_info, kwargs)
+            if handler.__class__ is Miss:
+                return handler
+        return RouteMatch(target=handler, match_info=match_info)
+
+    def match_many(self, requests):
+        """
+        Match a batch of requests against the router.
+
+        Args:
+            requests (Iterable[Dict[str, Any]]): the keyword arguments of each
+            match.
+
+        Returns:
+            List[Union[RouteMatch, Exception]]: a result for each request, in
+            input order. Requests which fail to match give the exception that
+            `match` would have raised.
+        """
+        results = []
+        for kwargs in requests:
+            try:
+                results.append(self.match(**kwargs))
+            except Exception as err:
+                results.append(err)
+        return results
+
+    def _dispatch(self, match_info, kwargs):
+        handler = self._resolve_into(match_info, kwargs)
+        return self._complete(handler, match_info, kwargs)
+
+    @staticmethod
+    def _complete(handler, match_info, kwargs):
+        # resolve nested router nodes until a handler is found
+        while isinstance(handler, AbstractRouter):
+            if type(handler).match is not AbstractRouter.match:
+                return handler.match(_match_info=match_info, **kwargs)
+            handler = handler._resolve_into(match_info, kwargs)
+        return RouteMatch(target=handler, match_info=match_info)
+
+    def _instrumented_dispatch(self, instrumentation, match_info, kwargs):
+        # the loop of `_dispatch` and `_complete`, recording each resolve
+        clock = instrumentation.clock
+        handler = self
+        try:
+            while isinstance(handler, AbstractRouter):
+                if (handler is not self and
+                        type(handler).match is not AbstractRouter.match):
+                    found = handler.match(_match_info=match_info, **kwargs)
+                    instrumentation.record_match()
+                    return found
+                router = handler
+                start = clock()
+                try:
+                    handler = router._instrumented_resolve(
+                        instrumentation, match_info, kwargs
+                    )
+                finally:
+                    instrumentation.record_resolve(router, clock() - start)
+        except Exception as err:
+            instrumentation.record_miss(err)
+            raise
+        instrumentation.record_match()
+        return RouteMatch(target=handler, match_info=match_info)
+
+    def _instrumented_resolve(self, instrumentation, match_info, kwargs):
+        """
+        Resolve a route while instrumentation is enabled.
+
+        Routers may override this to record finer-grained data, such as
+        per-node lookups; the default implementation calls `_resolve_into`.
+        """
+        return self._resolve_into(match_info, kwargs)
+
+    def enable_instrumentation(self, instrumentation=None):
+        """
+        Record hit counts, resolve timings and miss reasons of matches against
+        this router and the routers nested in it.
+
+        Instrumented matches take a separate code path, so matches against
+        routers without instrumentation only check that none is enabled. Match
+        caches are bypassed while instrumentation is enabled.
+
+        Args:
+            instrumentation (Instrumentation, optional): a collector, which may
+            be shared between routers. Defaults to a new one.
+
+        Returns:
+            Instrumentation
+        """
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        self._instrumentation = instrumentation
+        return instrumentation
+
+    def disable_instrumentation(self):
+        self._instrumentation = None
+
+    def enable_cache(self, maxsize=1024):
+        """
+        Cache the results of top-level matches against this router.
+
+        Results are keyed on the keyword arguments passed to `match`, so these
+        must be hashable to be cached. A result is dropped when routes change
+        in this router or in a nested router the match went through, unless
+        that nested router overrides `match`, whose own nested routers are not
+        tracked.
+
+        Args:
+            maxsize (int, optional): the maximum number of cached results.
+            Defaults to 1024.
+
+        Returns:
+            MatchCache
+        """
+        self._match_cache = MatchCache(maxsize)
+        return self._match_cache
+
+    def disable_cache(self):
+        self._match_cache = None
+
+    def _cached_match(self, cache, kwargs):
+        try:
+            key = frozenset(kwargs.items())
+            found = cache.get(key, self._routes_version)
+        except TypeError:  # unhashable argument
+            return self._dispatch({}, kwargs)
+        if found is None:
+            found, dependencies = self._tracked_dispatch(kwargs)
+            cache.put(key, found, dependencies)
+        return RouteMatch(
+            target=found.target, match_info=found.match_info.copy()
+        )
+
+    def _tracked_dispatch(self, kwargs):
+        # the loop of `_dispatch` and `_complete`, also returning the routes
+        # version of each nested router, read before it resolves
+        match_info = {}
+        dependencies = []
+        handler = self._resolve_into(match_info, kwargs)
+        while isinstance(handler, AbstractRouter):
+            dependencies.append((handler, handler._routes_version))
+            if type(handler).match is not AbstractRouter.match:
+                found = handler.match(_match_info=match_info, **kwargs)
+                return found, tuple(dependencies)
+            handler = handler._resolve_into(match_info, kwargs)
+        found = RouteMatch(target=handler, match_info=match_info)
+        return found, tuple(dependencies)
+
+    def _routes_changed(self):
+        self._routes_version += 1
 
     @abstractmethod
     def _resolve(self, match_info, **kwargs):
@@ -75,8 +362,54 @@ class AbstractRouter(metaclass=ABCMeta):
             Any exception type.
         """
 
+    def _resolve_into(self, match_info, kwargs):
+        """
+        Find a registered route handler, recording artifacts of routing in
+        place.
+
+        This is the method used by `match`. A single match_info dict is
+        threaded through every node of a routing tree, so implementations may
+        only add to it. The default implementation adapts `_resolve`; routers
+        override it to avoid copying match_info at every node.
+
+        Args:
+            match_info (Dict[str, Any]): Collected data from resolvers in the
+            routing tree, to be updated in place.
+
+            kwargs (Dict[str, Any]): Any arguments used to resolve a route.
+            This dict must not be modified.
+
+        Returns:
+            The matched handler.
+
+        Raises:
+            Any exception type.
+        """
+        handler, updated_match_info = self._resolve(match_info, **kwargs)
+        if updated_match_info is not match_info:
+            match_info.clear()
+            match_info.update(updated_match_info)
+        return handler
+
+    def _try_resolve_into(self, match_info, kwargs):
+        """
+        Find a registered route handler like `_resolve_into`, but return a
+        `Miss` rather than raising `exc_class` when there is none.
+
+        The default implementation adapts `_resolve_into`; routers override it
+        to report misses without raising.
+        """
+        try:
+            return self._resolve_into(match_info, kwargs)
+        except self.exc_class as err:
+            return Miss.from_exception(err, self, kwargs)
+
     def _build_exception(self, **extra):
         exc = self.exc_class()
-        exc._pyger = extra
-        exc._pyger.update(router=self)
+        if isinstance(exc, MatchError):
+            # built when first read
+            exc._pyger_context = (self, extra)
+        else:
+            exc._pyger = extra
+            extra['router'] = self
         return exc
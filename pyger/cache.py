@@ -0,0 +1,172 @@
+from collections import OrderedDict
+
+
+class MatchCache:
+    """
+    A bounded, least-recently-used store of match results.
+
+    Args:
+        maxsize (int, optional): the maximum number of results kept. Defaults
+        to 1024.
+
+    Attributes:
+        hits (int): the number of lookups answered from the cache.
+
+        misses (int): the number of lookups which were not cached.
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """
+        Look up a cached value.
+
+        Args:
+            key (Hashable): the cache key.
+
+            version (Any): the routes version of the caching router. All
+            entries are dropped if it differs from the version they were stored
+            under.
+
+        Returns:
+            The cached value, or None.
+        """
+        if version != self.version:
+            self.clear()
+            self.version = version
+        try:
+            value, dependencies = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        for router, routes_version in dependencies:
+            if router._routes_version != routes_version:
+                # a nested router changed since the value was stored
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, dependencies=()):
+        """
+        Store a value.
+
+        Args:
+            key (Hashable): the cache key.
+
+            value (Any): the value.
+
+            dependencies (Sequence[Tuple[AbstractRouter, int]], optional):
+            (router, routes version) pairs of the nested routers which found
+            the value. It is dropped once routes change in any of them.
+        """
+        self._entries[key] = (value, dependencies)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'maxsize': self.maxsize,
+            'size': len(self._entries),
+        }
+
+
+class MissCache:
+    """
+    A bounded record of paths, and leading path segments, known not to match.
+
+    Args:
+        maxsize (int, optional): the maximum number of paths, and separately of
+        leading segments, kept. Defaults to 1024.
+
+    Attributes:
+        short_circuited (int): the number of lookups rejected from the cache.
+
+        recorded (int): the number of misses added to the cache.
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.short_circuited = 0
+        self.recorded = 0
+        self.version = None
+        self._paths = OrderedDict()
+        self._prefixes = OrderedDict()
+
+    def rejects(self, path, prefix, version):
+        """
+        Check whether a lookup is known to miss.
+
+        Args:
+            path (Hashable): the full lookup key.
+
+            prefix (Hashable, optional): the leading segment of the lookup, or
+            None if it can not be determined without normalizing the path.
+
+            version (Any): the routes version of the router. All entries are
+            dropped if it differs from the version they were stored under.
+
+        Returns:
+            bool
+        """
+        if version != self.version:
+            self.clear()
+            self.version = version
+        if path in self._paths or (
+            prefix is not None and prefix in self._prefixes
+        ):
+            self.short_circuited += 1
+            return True
+        return False
+
+    def add(self, path, dead_prefix=None):
+        """
+        Record a miss.
+
+        Args:
+            path (Hashable): the full lookup key.
+
+            dead_prefix (Hashable, optional): a leading segment which no route
+            starts with.
+        """
+        self.recorded += 1
+        self._add(self._paths, path)
+        if dead_prefix is not None:
+            self._add(self._prefixes, dead_prefix)
+
+    def _add(self, entries, key):
+        entries[key] = None
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self._paths.clear()
+        self._prefixes.clear()
+
+    def info(self):
+        return {
+            'short_circuited': self.short_circuited,
+            'recorded': self.recorded,
+            'maxsize': self.maxsize,
+            'paths': len(self._paths),
+            'prefixes': len(self._prefixes),
+        }
@@ -0,0 +1,165 @@
+"""
+Opt-in instrumentation of matches.
+
+See `AbstractRouter.enable_instrumentation`.
+"""
+
+try:
+    from time import perf_counter_ns
+except ImportError:  # Python < 3.7
+    from time import perf_counter
+
+    def perf_counter_ns():
+        return int(perf_counter() * 1e9)
+
+
+class Instrumentation:
+    """
+    Hit counts, timings and miss reasons recorded by matches.
+
+    Routers are reported under a label, which defaults to the router's class
+    name and a number in the order routers were first seen; set readable labels
+    with `label`.
+
+    Args:
+        clock (Callable[[], int], optional): a function returning a time in
+        nanoseconds. Defaults to `time.perf_counter_ns`, or `time.perf_counter`
+        scaled to nanoseconds before Python 3.7.
+
+    Attributes:
+        matches (int): the number of matches which found a handler.
+
+        misses (int): the number of matches which raised an exception.
+
+        miss_reasons (Dict[str, int]): the number of misses by reason, as given
+        to `AbstractRouter._build_exception`, e.g. "no_segment", "partial_path"
+        or "method_not_allowed". Misses without a reason are counted as
+        "no_match" and other exceptions as "error".
+    """
+
+    def __init__(self, clock=perf_counter_ns):
+        self.clock = clock
+        self.matches = 0
+        self.misses = 0
+        self.miss_reasons = {}
+        self._labels = {}
+        self._routers = {}
+        self._nodes = {}
+
+    def label(self, router, name=None):
+        """
+        Get the label a router is reported under, or set it.
+
+        Args:
+            router (AbstractRouter): a router.
+
+            name (str, optional): the new label of the router.
+
+        Returns:
+            str
+        """
+        if name is not None:
+            self._labels[router] = name
+            return name
+        try:
+            return self._labels[router]
+        except KeyError:
+            name = self._labels[router] = '{}#{}'.format(
+                router.__class__.__name__, len(self._labels)
+            )
+            return name
+
+    def record_resolve(self, router, elapsed):
+        """
+        Record a router's `_resolve_into` call which took `elapsed`
+        nanoseconds.
+        """
+        try:
+            stats = self._routers[router]
+        except KeyError:
+            stats = self._routers[router] = [0, 0]
+        stats[0] += 1
+        stats[1] += elapsed
+
+    def record_node(self, router, path, elapsed):
+        """
+        Record a lookup of a path trie node which took `elapsed` nanoseconds.
+
+        Args:
+            router (AbstractRouter): the router the node belongs to.
+
+            path (str): the route prefix of the node, e.g. "/users/{id}".
+
+            elapsed (int): the time taken to find the node in its parent.
+        """
+        nodes = self._nodes.get(router)
+        if nodes is None:
+            nodes = self._nodes[router] = {}
+        try:
+            stats = nodes[path]
+        except KeyError:
+            stats = nodes[path] = [0, 0]
+        stats[0] += 1
+        stats[1] += elapsed
+
+    def node_hits(self, router):
+        """
+        Get the hit counts of the trie nodes of a path router.
+
+        Returns:
+            Dict[str, int]: hits keyed by the route prefix of each node.
+        """
+        return {
+            path: stats[0]
+            for path, stats in self._nodes.get(router, {}).items()
+        }
+
+    def record_match(self):
+        self.matches += 1
+
+    def record_miss(self, exc):
+        self.misses += 1
+        context = getattr(exc, '_pyger', None)
+        if context is None:
+            reason = 'error'
+        else:
+            reason = context.get('reason', 'no_match')
+        self.miss_reasons[reason] = self.miss_reasons.get(reason, 0) + 1
+
+    def reset(self):
+        """
+        Clear all counters, keeping router labels.
+        """
+        self.matches = 0
+        self.misses = 0
+        self.miss_reasons = {}
+        self._routers = {}
+        self._nodes = {}
+
+    def as_dict(self):
+        """
+        Export the recorded data.
+
+        Returns:
+            Dict[str, Any]: a dict of plain values, with per-router stats under
+            "routers" and per-node stats of path routers under "nodes", keyed
+            by router label and then by route prefix.
+        """
+        return {
+            'matches': self.matches,
+            'misses': self.misses,
+            'miss_reasons': dict(self.miss_reasons),
+            'routers': {
+                self.label(router): {
+                    'resolves': resolves, 'resolve_ns': elapsed
+                }
+                for router, (resolves, elapsed) in self._routers.items()
+            },
+            'nodes': {
+                self.label(router): {
+                    path: {'hits': hits, 'lookup_ns': elapsed}
+                    for path, (hits, elapsed) in nodes.items()
+                }
+                for router, nodes in self._nodes.items()
+            },
+        }
@@ -0,0 +1,112 @@
+"""
+Conversion of `URIPathRouter` route tables to and from JSON-compatible data.
+
+Tries are converted as they are built, so loading them does not parse route
+strings again, and regex segments are loaded as `DeferredPattern`s.
+"""
+
+from importlib import import_module
+from sys import intern
+
+from pyger.routers.patterns import DeferredPattern
+
+
+DUMP_FORMAT = 'pyger.URIPathRouter'
+DUMP_VERSION = 1
+
+
+def dump_node(path_map, reference):
+    """
+    Convert a trie node and its descendants to JSON-compatible data.
+
+    Args:
+        path_map (PathMap): the node.
+
+        reference (Callable[[Any], str]): a function returning a string
+        reference for a handler.
+
+    Returns:
+        dict
+    """
+    node_class = type(path_map)
+
+    def dump_value(value):
+        if isinstance(value, node_class):
+            return dump_node(value, reference)
+        return {'h': reference(value)}
+
+    dumped = {}
+    if path_map.plain_segments:
+        dumped['p'] = {
+            segment: dump_value(value)
+            for segment, value in list(path_map.plain_segments.items())
+        }
+    if path_map.regex_segments:
+        dumped['r'] = [
+            [segment_name, re_pattern.pattern, dump_value(value)]
+            for (segment_name, re_pattern), value
+            in path_map.regex_segments.items()
+        ]
+    return dumped
+
+
+def load_node(dumped, get_handler, node_class):
+    """
+    Create a trie node and its descendants from data given by `dump_node`.
+
+    Args:
+        dumped (dict): the converted node.
+
+        get_handler (Callable[[str], Any]): a function returning the handler
+        for a reference.
+
+        node_class (type): the class of trie nodes, e.g. `PathMap`.
+
+    Returns:
+        The node, an instance of `node_class`.
+    """
+    def load_value(value):
+        if 'h' in value:
+            return get_handler(value['h'])
+        return load_node(value, get_handler, node_class)
+
+    path_map = node_class()
+    if 'p' in dumped:
+        path_map.plain_segments = {
+            intern(segment): load_value(value)
+            for segment, value in dumped['p'].items()
+        }
+    if 'r' in dumped:
+        path_map.regex_segments = {
+            (intern(segment_name), DeferredPattern(pattern)): load_value(value)
+            for segment_name, pattern, value in dumped['r']
+        }
+    return path_map
+
+
+def handler_reference(handler):
+    """
+    Get the import path of a handler, in the form
+    "package.module:qualified.name".
+
+    Raises:
+        ValueError: if the handler can not be imported by name.
+    """
+    module = getattr(handler, '__module__', None)
+    qualname = getattr(handler, '__qualname__', None)
+    if not module or not qualname or '<locals>' in qualname:
+        raise ValueError(
+            'Handler {!r} can not be referenced by import path'.format(handler)
+        )
+    return module + ':' + qualname
+
+
+def resolve_reference(reference):
+    """
+    Import a handler from a path given by `handler_reference`.
+    """
+    module_name, _, qualname = reference.partition(':')
+    found = import_module(module_name)
+    for attribute in qualname.split('.'):
+        found = getattr(found, attribute)
+    return found
@@ -0,0 +1,326 @@
+"""
+A flattened, array-backed form of a `URIPathRouter` route table.
+
+The table is a single contiguous buffer which is matched against in place, so
+it can be written once to a memory-mapped file or to
+`multiprocessing.shared_memory` and shared by every worker process. Handlers
+are not stored in the buffer; each process supplies its own list of handlers
+which the table refers to by index.
+
+Buffer layout (native byte order, 32-bit signed integers):
+    header:       magic, version, node count, plain edge count,
+                  regex edge count, handler count, byte offset of the string
+                  area, its length
+    nodes:        plain edge start, plain edge count, regex edge start,
+                  regex edge count
+    plain edges:  segment checksum, segment offset, segment length, child
+    regex edges:  name offset, name length, pattern offset, pattern length,
+                  child
+    strings:      UTF-8 encoded segments, names and patterns
+
+A child is the index of a node when positive or zero, and
+`-(handler index + 1)` when negative. Plain edges of a node are sorted by
+checksum so they can be binary searched.
+"""
+
+from array import array
+from zlib import crc32
+
+from pyger.base import AbstractRouter, MatchError, Miss, _MissReason
+from pyger.routers.path import PathMap, decode_segments, get_path_segments
+from pyger.routers.patterns import DeferredPattern, make_regex_lookup
+
+
+_MAGIC = 0x50594752  # "PYGR"
+_VERSION = 1
+_HEADER_SIZE = 8
+_NODE_SIZE = 4
+_PLAIN_EDGE_SIZE = 4
+_REGEX_EDGE_SIZE = 5
+_ROOT_MARKER = ''
+_NO_SEGMENT = _MissReason('no_segment')
+_PARTIAL_PATH = _MissReason('partial_path')
+
+
+def _checksum(encoded):
+    return crc32(encoded) & 0x7fffffff
+
+
+def flatten(router):
+    """
+    Flatten the route table of a `URIPathRouter`.
+
+    Args:
+        router (URIPathRouter): the router to flatten.
+
+    Returns:
+        A tuple of the table as bytes and the list of handlers it refers to.
+    """
+    nodes = [router.map]
+    node_indexes = {id(router.map): 0}
+    handlers = []
+    handler_indexes = {}
+
+    def child_index(value):
+        if isinstance(value, PathMap):
+            if id(value) not in node_indexes:
+                node_indexes[id(value)] = len(nodes)
+                nodes.append(value)
+            return node_indexes[id(value)]
+        if id(value) not in handler_indexes:
+            handler_indexes[id(value)] = len(handlers)
+            handlers.append(value)
+        return -handler_indexes[id(value)] - 1
+
+    strings = bytearray()
+    string_offsets = {}
+
+    def string_ref(text):
+        encoded = text.encode('utf-8', 'surrogateescape')
+        if encoded not in string_offsets:
+            string_offsets[encoded] = len(strings)
+            strings.extend(encoded)
+        return string_offsets[encoded], len(encoded)
+
+    node_table = array('i')
+    plain_table = array('i')
+    regex_table = array('i')
+    i = 0
+    while i < len(nodes):  # nodes are appended as they are discovered
+        path_map = nodes[i]
+        plain_edges = sorted(
+            (_checksum(segment.encode('utf-8', 'surrogateescape')),
+             segment, value)
+            for segment, value in list(path_map.plain_segments.items())
+        )
+        node_table.extend((
+            len(plain_table) // _PLAIN_EDGE_SIZE, len(plain_edges),
+            len(regex_table) // _REGEX_EDGE_SIZE, len(path_map.regex_segments),
+        ))
+        for checksum, segment, value in plain_edges:
+            plain_table.extend(
+                (checksum,) + string_ref(segment) + (child_index(value),)
+            )
+        regex_segments = path_map.regex_segments
+        for (segment_name, re_pattern), value in regex_segments.items():
+            regex_table.extend(
+                string_ref(segment_name) + string_ref(re_pattern.pattern) +
+                (child_index(value),)
+            )
+        i += 1
+
+    tables = array('i', [0] * _HEADER_SIZE)
+    tables.extend(node_table)
+    tables.extend(plain_table)
+    tables.extend(regex_table)
+    tables[:_HEADER_SIZE] = array('i', (
+        _MAGIC, _VERSION, len(nodes), len(plain_table) // _PLAIN_EDGE_SIZE,
+        len(regex_table) // _REGEX_EDGE_SIZE, len(handlers),
+        len(tables) * tables.itemsize, len(strings),
+    ))
+    return tables.tobytes() + bytes(strings), handlers
+
+
+class FlatPathRouter(AbstractRouter):
+    """
+    A read-only path router which matches against a table built by `flatten`.
+
+    Matching follows the same rules as `URIPathRouter`. Regex segments are
+    compiled in each process when they are first needed.
+
+    Args:
+        buffer (Buffer): the table, e.g. bytes, an `mmap.mmap` or the `buf`
+        of a `multiprocessing.shared_memory.SharedMemory`. It is not copied.
+
+        handlers (Sequence[Any]): the handlers referred to by the table, in the
+        order returned by `flatten`.
+
+        path_key (str, optional): the name of the keyword argument to be used
+        when matching routes. Defaults to "path".
+
+        raises (Exception, optional): an exception class to be raised when no
+        match is found. Defaults to `pyger.base.MatchError`.
+
+        decode (bool, optional): percent-decode path segments as
+        `URIPathRouter` does. Defaults to False.
+
+    Usage:
+        >>> table, handlers = flatten(router)
+        >>> shared = SharedMemory(create=True, size=len(table))
+        >>> shared.buf[:len(table)] = table
+        >>> # in each worker process:
+        >>> flat_router = FlatPathRouter(shared.buf, handlers)
+    """
+
+    def __init__(self, buffer, handlers, path_key='path', raises=MatchError,
+                 decode=False):
+        view = memoryview(buffer)
+        header = view[:_HEADER_SIZE * 4].cast('i')
+        if header[0] != _MAGIC or header[1] != _VERSION:
+            raise ValueError(
+                'Not a route table built by pyger.routers.flat.flatten'
+            )
+        if header[5] != len(handlers):
+            raise ValueError(
+                'The table refers to {} handlers but {} were given'.format(
+                    header[5], len(handlers)
+                )
+            )
+        strings_offset = header[6]
+        self._ints = view[:strings_offset].cast('i')
+        self._strings = view[strings_offset:strings_offset + header[7]]
+        self._plain_base = _HEADER_SIZE + header[2] * _NODE_SIZE
+        self._regex_base = self._plain_base + header[3] * _PLAIN_EDGE_SIZE
+        self._regex_lookups = {}
+        self.handlers = handlers
+        self.path_key = path_key
+        self.exc_class = raises
+        self.decode = decode
+
+    @classmethod
+    def from_router(cls, router, **kwargs):
+        """
+        Create a flat router from a `URIPathRouter` in the current process.
+        """
+        table, handlers = flatten(router)
+        kwargs.setdefault('decode', router.decode)
+        return cls(table, handlers, path_key=router.path_key, **kwargs)
+
+    def connect(self, handler, **kwargs):
+        raise TypeError(
+            'FlatPathRouter is read-only; '
+            'flatten a URIPathRouter to change routes'
+        )
+
+    def _resolve(self, match_info, **kwargs):
+        updated_match = match_info.copy()
+        return self._resolve_into(updated_match, kwargs), updated_match
+
+    def _resolve_into(self, match_info, kwargs):
+        found = self._find(match_info, kwargs)
+        if found.__class__ is _MissReason:
+            raise self._build_exception(kwargs=kwargs, reason=found.reason)
+        return found
+
+    def _try_resolve_into(self, match_info, kwargs):
+        found = self._find(match_info, kwargs)
+        if found.__class__ is _MissReason:
+            return Miss(self, kwargs, found.reason)
+        return found
+
+    def _find(self, match_info, kwargs):
+        # returns the handler, or the reason of a miss
+        path = kwargs.get(self.path_key)
+        if path is None:
+            raise TypeError(
+                'Expected keyword argument "{path_key}" '
+                'but received {passed_args}'.format(
+                    path_key=self.path_key, passed_args=list(kwargs.keys())
+                )
+            )
+        segments = get_path_segments(path)
+        if self.decode:
+            decode_segments(segments)
+        try:
+            child, dispatch_matches = self._traverse(segments)
+        except LookupError:
+            return _NO_SEGMENT
+        if child >= 0:
+            # a route may end at this node
+            child = self._get_plain(child, _ROOT_MARKER)
+            if child is None or child >= 0:
+                # traversal did not lead to a leaf node
+                return _PARTIAL_PATH
+        found = self.handlers[-child - 1]
+        match_info.update(dispatch_matches)
+        return found
+
+    def _traverse(self, path_segments):
+        if not path_segments:
+            try:
+                child, _ = self._get(0, _ROOT_MARKER)
+            except KeyError:
+                # the path ended on the root node
+                child = 0
+            return child, {}
+
+        child = 0
+        dispatch_matches = {}
+        for i, segment in enumerate(path_segments):
+            if child < 0:
+                # we have more segments to process but we ran out of nodes
+                raise KeyError(segment)
+            child, segment_name = self._get(child, segment)
+            if segment_name is not None:
+                if segment_name.startswith('*'):
+                    # this node collects following path segments
+                    dispatch_matches[segment_name] = tuple(path_segments[i:])
+                    break  # globbing variables only allowed as last segment
+                dispatch_matches[segment_name] = segment
+        return child, dispatch_matches
+
+    def _get(self, node, segment):
+        child = self._get_plain(node, segment)
+        if child is not None:
+            return child, None
+
+        ints = self._ints
+        offset = _HEADER_SIZE + node * _NODE_SIZE
+        if ints[offset + 3]:
+            regex_lookup = self._regex_lookups.get(node)
+            if regex_lookup is None:
+                regex_lookup = self._make_regex_lookup(
+                    ints[offset + 2], ints[offset + 3]
+                )
+                self._regex_lookups[node] = regex_lookup
+            found = regex_lookup(segment)
+            if found is not None:
+                return found
+        raise KeyError(segment)
+
+    def _get_plain(self, node, segment):
+        ints = self._ints
+        offset = _HEADER_SIZE + node * _NODE_SIZE
+        plain_start = ints[offset]
+        plain_end = plain_start + ints[offset + 1]
+        if plain_start == plain_end:
+            return None
+
+        # undecodable bytes of bytes paths are kept as surrogate escapes
+        encoded = segment.encode('utf-8', 'surrogateescape')
+        checksum = _checksum(encoded)
+        low = plain_start
+        high = plain_end
+        while low < high:
+            middle = (low + high) // 2
+            if ints[self._plain_base + middle * _PLAIN_EDGE_SIZE] < checksum:
+                low = middle + 1
+            else:
+                high = middle
+        strings = self._strings
+        while low < plain_end:
+            edge = self._plain_base + low * _PLAIN_EDGE_SIZE
+            if ints[edge] != checksum:
+                break
+            start = ints[edge + 1]
+            if strings[start:start + ints[edge + 2]] == encoded:
+                return ints[edge + 3]
+            low += 1
+        return None
+
+    def _make_regex_lookup(self, start, count):
+        ints = self._ints
+        entries = []
+        for index in range(start, start + count):
+            edge = self._regex_base + index * _REGEX_EDGE_SIZE
+            entries.append((
+                self._string(ints[edge], ints[edge + 1]),
+                DeferredPattern(self._string(ints[edge + 2], ints[edge + 3])),
+                ints[edge + 4],
+            ))
+        return make_regex_lookup(entries)
+
+    def _string(self, start, length):
+        return str(
+            self._strings[start:start + length], 'utf-8', 'surrogateescape'
+        )
@@ -1,27 +1,110 @@
-from pyger.base import AbstractRouter, MatchError
+from collections import namedtuple
+
+from pyger.base import AbstractRouter, MatchError, Miss
+
+
+_NOT_FOUND = object()
+
+
+AllowedMethods = namedtuple('AllowedMethods', ['methods', 'allow'])
+AllowedMethods.__doc__ = """
+The target matched by an implicit OPTIONS route: the methods a router serves,
+as a frozenset and as the value of an HTTP `Allow` header.
+"""
 
 
 class HTTPMethodRouter(AbstractRouter):
-    def __init__(self, method_key='method', method_any='*', raises=MatchError):
+    """
+    A router which dispatches based on the request method.
+
+    Args:
+        method_key (str, optional): the name of the keyword argument to be used
+        when matching routes. Defaults to "method".
+
+        method_any (str, optional): the method of a route which serves every
+        method without a route of its own. Defaults to "*".
+
+        raises (Exception, optional): an exception class to be raised when no
+        match is found. Defaults to `pyger.base.MatchError`.
+
+        implicit_head (bool, optional): serve HEAD requests with the GET route
+        when there is no HEAD route. Defaults to False.
+
+        implicit_options (bool, optional): match OPTIONS requests without an
+        OPTIONS route to an `AllowedMethods` target. Defaults to False.
+
+    Implicit routes are only added to routers without a `method_any` route.
+
+    Attributes:
+        allowed (FrozenSet[str]): the methods served by the router, including
+        implicit routes.
+
+        allow (str): `allowed` as the value of an HTTP `Allow` header.
+
+    Both are computed by `connect`, and given in the `_pyger` context of
+    "method_not_allowed" misses.
+    """
+
+    def __init__(self, method_key='method', method_any='*', raises=MatchError,
+                 implicit_head=False, implicit_options=False):
         self.method_key = method_key
         self.method_any = method_any
+        self.implicit_head = implicit_head
+        self.implicit_options = implicit_options
         self.map = {}
         self.exc_class = raises
+        self._update_lookup()
 
     def connect(self, handler, **kwargs):
         method = self._get_method_arg(kwargs)
         self.map[method] = handler
+        self._update_lookup()
+        self._routes_changed()
+
+    def _update_lookup(self):
+        lookup = dict(self.map)
+        self._any = lookup.pop(self.method_any, _NOT_FOUND)
+        implicit = self._any is _NOT_FOUND
+        if implicit and self.implicit_head and 'GET' in lookup:
+            lookup.setdefault('HEAD', lookup['GET'])
+        implicit_options = (
+            implicit and self.implicit_options and 'OPTIONS' not in lookup
+        )
+        self.allowed = frozenset(lookup)
+        if implicit_options:
+            self.allowed |= {'OPTIONS'}
+        self.allow = ', '.join(sorted(self.allowed))
+        if implicit_options:
+            lookup['OPTIONS'] = AllowedMethods(self.allowed, self.allow)
+        self._lookup = lookup
 
     def _resolve(self, match_info, **kwargs):
-        sentinel = object()
-        default = self.map.get(self.method_any, sentinel)
-        if default is not sentinel:
-            return default, match_info.copy()
-        method = self._get_method_arg(kwargs)
-        try:
-            return self.map[method], match_info.copy()
-        except LookupError as err:
-            raise self._build_exception(kwargs=kwargs) from err
+        updated_match = match_info.copy()
+        return self._resolve_into(updated_match, kwargs), updated_match
+
+    def _resolve_into(self, match_info, kwargs):
+        handler = self._lookup.get(kwargs.get(self.method_key), _NOT_FOUND)
+        if handler is not _NOT_FOUND:
+            return handler
+        if self._any is not _NOT_FOUND:
+            return self._any
+        self._get_method_arg(kwargs)
+        raise self._build_exception(
+            kwargs=kwargs, reason='method_not_allowed',
+            allowed=self.allowed, allow=self.allow
+        )
+
+    def _try_resolve_into(self, match_info, kwargs):
+        handler = self._lookup.get(kwargs.get(self.method_key), _NOT_FOUND)
+        if handler is not _NOT_FOUND:
+            return handler
+        if self._any is not _NOT_FOUND:
+            return self._any
+        self._get_method_arg(kwargs)
+        return Miss(
+            self, kwargs, 'method_not_allowed',
+            allowed=self.allowed, allow=self.allow
+        )
 
     def _get_method_arg(self, kwarg_dict):
         method = kwarg_dict.get(self.method_key)
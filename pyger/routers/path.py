@@ -1,16 +1,97 @@
-from pyger.base import AbstractRouter, MatchError
+from pyger.base import AbstractRouter, MatchError, Miss, _MissReason
+from pyger.cache import MissCache
+from pyger.instrument import Instrumentation
+from pyger.routers.dump import (
+    DUMP_FORMAT, DUMP_VERSION, dump_node, handler_reference, load_node,
+    resolve_reference
+)
+from pyger.routers.patterns import (
+    DeferredPattern, make_regex_lookup, matches_every_segment, order_by_hits,
+    segments_disjoint
+)
+from collections import namedtuple
+from sys import intern
+from threading import Lock
+from types import MappingProxyType
+from urllib.parse import quote, unquote
+import json
 import re
 
 
+# shared by all nodes until they get children
+_EMPTY_TABLE = MappingProxyType({})
+# nodes with fewer regex children are searched instead
+_REGEX_INDEX_MIN_SIZE = 16
+# allowed in path segments besides unreserved characters
+_URL_SAFE = "!$&'()*+,;=:@"
+_NEEDS_QUOTING = re.compile(r"[^A-Za-z0-9\-._~!$&'()*+,;=:@]")
+_DEFAULT_SEGMENT_PATTERN = '[^/]+'
+_NOT_FOUND = object()
+_CACHED_MISS = _MissReason('cached_miss')
+_NO_SEGMENT = _MissReason('no_segment')
+_PARTIAL_PATH = _MissReason('partial_path')
+
+
+RouteConflict = namedtuple('RouteConflict', ['kind', 'path', 'detail'])
+
+
 def get_path_segments(path):
-    base_segments = [x for x in path.split('/') if x and x != '.']
-    output_buffer = []
-    for s in base_segments:
-        if s == '..':
-            output_buffer = output_buffer[:-1]
-        else:
-            output_buffer.append(s)
-    return output_buffer
+    """
+    Split a path into normalized segments.
+
+    Empty and "." segments are dropped and ".." segments remove the segment
+    before them. Paths may also be bytes-like objects, such as an ASGI
+    `raw_path`, in which case each segment is decoded as UTF-8 on its own.
+
+    Args:
+        path (Union[str, bytes, bytearray, memoryview]): the path.
+
+    Returns:
+        List[str]
+    """
+    if isinstance(path, str):
+        return _split_segments(path, '/', '.', '..')
+    return [
+        str(segment, 'utf-8', 'surrogateescape')
+        for segment in _split_segments(bytes(path), b'/', b'.', b'..')
+    ]
+
+
+def decode_segments(segments):
+    """
+    Percent-decode path segments in place.
+
+    Only segments containing "%" are decoded. Decoding happens after dot
+    segments are removed, so encoded dots and slashes stay within a segment.
+
+    Args:
+        segments (List[str]): normalized path segments.
+
+    Returns:
+        The same list.
+    """
+    for i, segment in enumerate(segments):
+        if '%' in segment:
+            segments[i] = unquote(segment)
+    return segments
+
+
+def _split_segments(path, separator, dot, dot_dot):
+    path = path.strip(separator)
+    if not path:
+        return []
+    if (not path.startswith(dot) and separator + dot not in path and
+            separator + separator not in path):
+        # there are no empty or dot segments to remove
+        return path.split(separator)
+    segments = []
+    for segment in path.split(separator):
+        if segment == dot_dot:
+            if segments:
+                segments.pop()
+        elif segment and segment != dot:
+            segments.append(segment)
+    return segments
 
 
 class URIPathRouter(AbstractRouter):
@@ -19,60 +100,711 @@ class URIPathRouter(AbstractRouter):
 
     Args:
         path_key (str, optional): the name of the keyword argument to be used
-        when matching routes. Defaults to "path".
+        when matching routes. Paths may be given as str or as UTF-8 encoded
+        bytes-like objects. Defaults to "path".
 
         raises (Exception, optional): an exception class to be raised when no
         match is found. Defaults to `pyger.base.MatchError`.
 
+        engine (str, optional): the lookup engine. `None` walks the `PathMap`
+        trie, committing to the first matching child of each node;
+        "backtracking" walks the trie but tries the other matching children of
+        a node when a branch fails to match the rest of the path. Defaults to
+        `None`.
+
+        decode (bool, optional): percent-decode each path segment which
+        contains "%" before looking it up, so routes and match_info values use
+        decoded text. A decoded segment may contain "/", which the default
+        `[^/]+` segment pattern does not match. Defaults to False.
+
+    Matches never lock, and never see part of a route while other threads
+    change routes. `connect` links each new route into the trie with a single
+    store once it is built; `connect_many` and `disconnect` build a new version
+    of the route table, sharing unchanged nodes, and replace `map` with it in
+    one assignment.
+
     Usage:
         >>> router = URIPathRouter()
         >>> router.connect(index_handler, path='/index')
-        >>> router.connect(article_handler, path='/articles/{category}/{id:[0-9]+}')
+        >>> router.connect(article_handler,
+        ...                path='/articles/{category}/{id:[0-9]+}',
+        ...                name='article')
         >>> router.match('/index')
         RouteMatch(target=index_handler, match_info={})
         >>> router.match('/articles/books/123')
         RouteMatch(target=article_handler, match_info={'category': 'books', 'id': '123'})
         >>> router.match('/not/valid')
         MatchError
+        >>> router.url_for('article', category='books', id=123)
+        '/articles/books/123'
     """
 
-    def __init__(self, path_key='path', raises=MatchError):
+    engines = (None, 'backtracking')
+
+    def __init__(self, path_key='path', raises=MatchError, engine=None,
+                 decode=False):
+        if engine not in self.engines:
+            raise ValueError('Unknown engine: {!r}'.format(engine))
         self.path_key = path_key
         self.map = PathMap()
         self.exc_class = raises
+        self.engine = engine
+        self.decode = decode
         self._root_marker = ''
+        self._miss_cache = None
+        self._url_templates = {}
+        self._write_lock = Lock()
+        self.frozen = False
 
-    def connect(self, handler, **kwargs):
-        path = self._get_path_arg(kwargs)
-        segments = get_path_segments(path)
-        node = self.map
+    def __getstate__(self):
+        # the lock is not pickled
+        state = self.__dict__.copy()
+        del state['_write_lock']
+        state['_url_templates'] = dict(self._url_templates)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._write_lock = Lock()
+        if self.frozen:
+            self._url_templates = MappingProxyType(self._url_templates)
+
+    def connect(self, handler, name=None, **kwargs):
+        with self._write_lock:
+            self._check_not_frozen()
+            path = self._get_path_arg(kwargs)
+            segments = get_path_segments(path)
+            template = self._check_route(
+                path, segments, name, self._url_templates
+            )
+            self._connect_in_place(segments, handler)
+            if name is not None:
+                self._url_templates[name] = template
+            self._routes_changed()
+
+    def connect_many(self, routes):
+        """
+        Register several routes as one update.
+
+        The routes are added to a new version of the route table which
+        replaces the current one once they are all connected, so a match never
+        sees part of the batch. If any route is invalid, none are connected.
+
+        Args:
+            routes (Iterable[Tuple[Any, Dict[str, Any]]]): (handler, kwargs)
+            pairs, where kwargs are the keyword arguments `connect` takes.
+        """
+        with self._write_lock:
+            self._check_not_frozen()
+            root, templates, fresh = self._begin_update()
+            for handler, kwargs in routes:
+                kwargs = dict(kwargs)
+                name = kwargs.pop('name', None)
+                self._connect(root, templates, fresh, handler, name, kwargs)
+            self._commit_update(root, templates)
+
+    def disconnect(self, **kwargs):
+        """
+        Remove a route, along with any names it was connected with.
+
+        Args:
+            **kwargs: the path of the route as it was connected, e.g.
+            `path='/users/{id:\\d+}'`.
+
+        Raises:
+            KeyError: if no route is connected with the path.
+        """
+        with self._write_lock:
+            self._check_not_frozen()
+            path = self._get_path_arg(kwargs)
+            segments = get_path_segments(path)
+            root, templates, _ = self._begin_update()
+            try:
+                self._disconnect(root, segments)
+            except KeyError:
+                raise KeyError(
+                    'No route is connected with {!r}'.format(path)
+                ) from None
+            for name, template in list(templates.items()):
+                if get_path_segments(template.path) == segments:
+                    del templates[name]
+            self._commit_update(root, templates)
+
+    def freeze(self):
+        """
+        Make the route table read-only.
+
+        Every node's regex lookup is built and deferred patterns are compiled
+        up front, so matching no longer writes to the route table and a frozen
+        router may be shared by threads without locking. Opt-in match and miss
+        caches are still updated by matches. Connecting routes afterwards
+        raises `TypeError`.
+        """
+        with self._write_lock:
+            if self.frozen:
+                return
+            self.map.freeze()
+            self._url_templates = MappingProxyType(self._url_templates)
+            self.frozen = True
+
+    def optimize(self, profile):
+        """
+        Reorder parameterized siblings so that frequently matched segments are
+        tried first.
+
+        Siblings are only reordered where this can not change which route a
+        path matches: a segment moves ahead of another only if
+        `segments_disjoint` proves that no path segment matches both.
+
+        Args:
+            profile (Union[Instrumentation, Iterable[str]]): hit counts
+            recorded by instrumentation enabled on this router (see
+            `AbstractRouter.enable_instrumentation`), or request paths from
+            which to count them.
+
+        Returns:
+            int: the number of trie nodes whose siblings were reordered.
+        """
+        if not isinstance(profile, Instrumentation):
+            paths = profile
+            profile = Instrumentation(clock=lambda: 0)
+            for path in paths:
+                try:
+                    self._instrumented_walk(profile, {}, {self.path_key: path})
+                except (LookupError, TypeError):
+                    pass
+        hits = profile.node_hits(self)
+        with self._write_lock:
+            self._check_not_frozen()
+            reordered = []
+            root = self._optimize_node(self.map, '', hits, reordered)
+            if root is not self.map:
+                self._commit_update(root, self._url_templates)
+        return len(reordered)
+
+    def _optimize_node(self, node, path, hits, reordered):
+        # returns a reordered copy of the node, or the node if nothing changed
+        children = {}
+        for segment, value in node.plain_segments.items():
+            if isinstance(value, PathMap):
+                optimized = self._optimize_node(
+                    value, path + '/' + segment, hits, reordered
+                )
+                if optimized is not value:
+                    children[segment] = optimized
+
+        regex_items = list(node.regex_segments.items())
+        patterns = []
+        regex_hits = []
+        for position, (key, value) in enumerate(regex_items):
+            definition = format_segment(*key)
+            patterns.append(key[1].pattern)
+            regex_hits.append(hits.get(path + '/' + definition, 0))
+            if isinstance(value, PathMap):
+                optimized = self._optimize_node(
+                    value, path + '/' + definition, hits, reordered
+                )
+                regex_items[position] = (key, optimized)
+        order = []
+        if len(patterns) > 1:
+            order = order_by_hits(patterns, regex_hits)
+
+        if not children and order == sorted(order) and all(
+            value is node.regex_segments[key] for key, value in regex_items
+        ):
+            return node
+        if order != sorted(order):
+            reordered.append(path)
+            regex_items = [regex_items[index] for index in order]
+        optimized = node.copy()
+        if children:
+            optimized.plain_segments.update(children)
+        if regex_items:
+            optimized.regex_segments = dict(regex_items)
+            optimized._regex_last = None
+        return optimized
+
+    def _check_not_frozen(self):
+        if self.frozen:
+            raise TypeError(
+                'URIPathRouter is frozen; routes can not be changed'
+            )
 
+    def _begin_update(self):
+        # Updates copy each node on the way to a changed route and share every
+        # other node with the current route table. `fresh` holds the ids of the
+        # copies, which are not visible to matches and may be changed in place.
+        root = self.map.copy()
+        return root, dict(self._url_templates), {id(root)}
+
+    def _commit_update(self, root, templates):
+        # a single assignment publishes the new route table to matches
+        self._url_templates = templates
+        self.map = root
+        self._routes_changed()
+
+    def _check_route(self, path, segments, name, templates):
+        # returns the URL template of a named route
         for segment in segments[:-1]:
             if segment.startswith('{*'):
                 raise ValueError(
                     'Globbing path segments (`*foo`) can only be '
                     'used as the last segment in a path'
                 )
+        if name is None:
+            return None
+        existing = templates.get(name)
+        if existing is not None and existing.path != path:
+            raise ValueError(
+                'Route name {!r} is already used for {!r}'.format(
+                    name, existing.path
+                )
+            )
+        return URLTemplate(path)
+
+    def _connect_in_place(self, segments, handler):
+        # Adds a route to the current route table. A new branch is built before
+        # it is linked into the trie, and a node whose parameterized segments
+        # change is replaced by an updated copy, since matches iterate and
+        # cache those; so each route is published to matches with a single
+        # store.
+        node = self.map
+        parents = []
+        for index, segment in enumerate(segments[:-1]):
+            next_node = node.child(segment)
+            if not isinstance(next_node, PathMap):
+                branch = PathMap()
+                if next_node is not None:
+                    # keep the route which ends at this segment
+                    branch.set(self._root_marker, next_node)
+                self._add_branch(branch, segments[index + 1:], handler)
+                self._publish(parents, node, segment, branch)
+                return
+            parents.append((node, segment))
+            node = next_node
+
+        last_segment = segments[-1] if segments else self._root_marker
+        existing_node = node.child(last_segment)
+        if isinstance(existing_node, PathMap):
+            # longer routes continue from this segment
+            parents.append((node, last_segment))
+            node, last_segment = existing_node, self._root_marker
+        self._publish(parents, node, last_segment, handler)
+
+    @staticmethod
+    def _add_branch(node, segments, handler):
+        # add a chain of new nodes below a node which is not yet published
+        for segment in segments[:-1]:
             next_node = PathMap()
             node.set(segment, next_node)
             node = next_node
+        node.set(segments[-1], handler)
+
+    def _publish(self, parents, node, segment, value):
+        # `parents` holds the (node, segment) pairs on the way to `node`
+        while segment.startswith('{'):
+            node = node._replacement()
+            node.set(segment, value)
+            value = node
+            if not parents:
+                self.map = value
+                return
+            node, segment = parents.pop()
+        node.set(segment, value)
+
+    def _connect(self, root, templates, fresh, handler, name, kwargs):
+        path = self._get_path_arg(kwargs)
+        segments = get_path_segments(path)
+        template = self._check_route(path, segments, name, templates)
+        node = root
+
+        for segment in segments[:-1]:
+            next_node = node.child(segment)
+            if not isinstance(next_node, PathMap):
+                existing_handler = next_node
+                next_node = PathMap()
+                fresh.add(id(next_node))
+                if existing_handler is not None:
+                    # keep the route which ends at this segment
+                    next_node.set(self._root_marker, existing_handler)
+                node.set(segment, next_node)
+            elif id(next_node) not in fresh:
+                next_node = next_node.copy()
+                fresh.add(id(next_node))
+                node.set(segment, next_node)
+            node = next_node
 
         last_segment = segments[-1] if segments else self._root_marker
-        node.set(last_segment, handler)
+        existing_node = node.child(last_segment)
+        if isinstance(existing_node, PathMap):
+            # longer routes continue from this segment
+            if id(existing_node) not in fresh:
+                existing_node = existing_node.copy()
+                fresh.add(id(existing_node))
+                node.set(last_segment, existing_node)
+            existing_node.set(self._root_marker, handler)
+        else:
+            node.set(last_segment, handler)
+        if name is not None:
+            templates[name] = template
+
+    def _disconnect(self, node, segments):
+        # remove a route from a fresh copy of a node
+        if not segments:
+            node.remove(self._root_marker)
+            return
+        segment = segments[0]
+        value = node.child(segment)
+        if not isinstance(value, PathMap):
+            if len(segments) > 1:
+                raise KeyError(segment)
+            node.remove(segment)
+            return
+
+        value = value.copy()
+        self._disconnect(value, segments[1:])
+        if not value.plain_segments and not value.regex_segments:
+            node.remove(segment)
+        elif (not value.regex_segments and
+                list(value.plain_segments) == [self._root_marker]):
+            # only the route ending at this segment is left
+            node.set(segment, value.plain_segments[self._root_marker])
+        else:
+            node.set(segment, value)
+
+    def url_for(self, _name, _validate=False, **params):
+        """
+        Build the path of a named route.
+
+        Args:
+            _name (str): the name the route was connected with.
+
+            _validate (bool, optional): check each value against the pattern of
+            its path segment. Defaults to False.
+
+            **params: a value for each parameterized segment. Remainder
+            segments (`{*rest}`) are given without the "*", as a string or a
+            sequence of segments. Values are percent-encoded, including
+            values which are dot segments ("." and "..").
+
+        Returns:
+            str
+
+        Raises:
+            KeyError: if the route name or a parameter is unknown.
+
+            ValueError: if a value, or a segment of a remainder value, is
+            empty, or if validation is enabled and a value does not match.
+        """
+        return self._url_templates[_name].build(params, _validate)
+
+    def dump(self, fp, reference=None):
+        """
+        Write the router's route table to a file as JSON.
+
+        The built trie is written as-is, so `load` restores it without parsing
+        route strings again.
+
+        Args:
+            fp (TextIO): a file opened for writing text.
+
+            reference (Callable[[Any], str], optional): a function returning a
+            string reference for a handler. Defaults to `handler_reference`,
+            which gives the handler's import path.
+        """
+        reference = reference or handler_reference
+        json.dump({
+            'format': DUMP_FORMAT,
+            'version': DUMP_VERSION,
+            'path_key': self.path_key,
+            'decode': self.decode,
+            'names': {
+                name: template.path
+                for name, template in list(self._url_templates.items())
+            },
+            'root': dump_node(self.map, reference),
+        }, fp, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, fp, resolve=None, **kwargs):
+        """
+        Create a router from a route table written by `dump`.
+
+        Regex path segments are compiled when they are first matched against
+        rather than while loading.
+
+        Args:
+            fp (TextIO): a file opened for reading text.
+
+            resolve (Callable[[str], Any], optional): a function returning the
+            handler for a reference. Defaults to `resolve_reference`, which
+            imports the handler from its import path.
+
+            **kwargs: other arguments for the router's constructor.
+
+        Returns:
+            URIPathRouter
+        """
+        data = json.load(fp)
+        if (data.get('format') != DUMP_FORMAT or
+                data.get('version') != DUMP_VERSION):
+            raise ValueError('Not a route table written by URIPathRouter.dump')
+        resolve = resolve or resolve_reference
+        handlers = {}
+
+        def get_handler(ref):
+            try:
+                return handlers[ref]
+            except KeyError:
+                handler = handlers[ref] = resolve(ref)
+                return handler
+
+        kwargs.setdefault('decode', data.get('decode', False))
+        router = cls(path_key=data['path_key'], **kwargs)
+        router.map = load_node(data['root'], get_handler, PathMap)
+        router._url_templates = {
+            name: URLTemplate(path)
+            for name, path in data.get('names', {}).items()
+        }
+        router._routes_changed()
+        return router
+
+    def enable_miss_cache(self, maxsize=1024):
+        """
+        Reject paths which are known not to match before walking the trie.
+
+        Missed paths are remembered, as are leading path segments that no
+        route starts with (e.g. "wp-admin"), so that any later path under such
+        a segment is rejected straight away. The cache is cleared whenever a
+        route is connected to this router. Only str paths are cached.
+
+        Args:
+            maxsize (int, optional): the maximum number of remembered paths,
+            and separately of leading segments. Defaults to 1024.
+
+        Returns:
+            MissCache
+        """
+        self._miss_cache = MissCache(maxsize)
+        return self._miss_cache
+
+    def disable_miss_cache(self):
+        self._miss_cache = None
 
     def _resolve(self, match_info, **kwargs):
+        updated_match = match_info.copy()
+        return self._resolve_into(updated_match, kwargs), updated_match
+
+    def _resolve_into(self, match_info, kwargs):
+        found = self._find(match_info, kwargs)
+        if found.__class__ is _MissReason:
+            raise self._build_exception(kwargs=kwargs, reason=found.reason)
+        return found
+
+    def _try_resolve_into(self, match_info, kwargs):
+        found = self._find(match_info, kwargs)
+        if found.__class__ is _MissReason:
+            return Miss(self, kwargs, found.reason)
+        return found
+
+    def _find(self, match_info, kwargs):
+        # returns the handler, or the reason of a miss
         path = self._get_path_arg(kwargs)
-        segments = get_path_segments(path)
+        miss_cache = self._miss_cache if isinstance(path, str) else None
+        if miss_cache is not None:
+            prefix = self._get_path_prefix(path)
+            if miss_cache.rejects(path, prefix, self._routes_version):
+                return _CACHED_MISS
+        segments = self._get_segments(path)
         try:
             found, dispatch_matches = self.traverse_map(segments)
-        except LookupError as err:
-            raise self._build_exception(kwargs=kwargs) from err
+        except LookupError:
+            found = _NOT_FOUND
+        if found is _NOT_FOUND:
+            if miss_cache is not None:
+                self._record_miss(miss_cache, path, segments)
+            return _NO_SEGMENT
         if isinstance(found, PathMap):
             # traversal did not lead to a leaf node
-            raise self._build_exception(kwargs=kwargs)
-        updated_match = match_info.copy()
-        updated_match.update(dispatch_matches)
-        return found, updated_match
+            if miss_cache is not None:
+                miss_cache.add(path)
+            return _PARTIAL_PATH
+        match_info.update(dispatch_matches)
+        return found
+
+    def _instrumented_resolve(self, instrumentation, match_info, kwargs):
+        # Walks the trie like `_traverse_map`, timing each node lookup;
+        # backtracking lookups are only recorded per router.
+        if self.engine == 'backtracking':
+            return self._resolve_into(match_info, kwargs)
+        return self._instrumented_walk(instrumentation, match_info, kwargs)
+
+    def _instrumented_walk(self, instrumentation, match_info, kwargs):
+        clock = instrumentation.clock
+        segments = self._get_segments(self._get_path_arg(kwargs))
+        node = self.map
+        prefix = ''
+        dispatch_matches = {}
+        if not segments:
+            node = self._root_target(node)
+        for i, segment in enumerate(segments):
+            if not isinstance(node, PathMap):
+                raise self._build_exception(kwargs=kwargs, reason='no_segment')
+            start = clock()
+            try:
+                next_node, segment_name = node.get(segment)
+            except KeyError:
+                next_node = _NOT_FOUND
+            if next_node is _NOT_FOUND:
+                raise self._build_exception(kwargs=kwargs, reason='no_segment')
+            elapsed = clock() - start
+            if segment_name is None:
+                prefix += '/' + segment
+            else:
+                prefix += '/' + node.definition(segment_name, next_node)
+            instrumentation.record_node(self, prefix, elapsed)
+            node = next_node
+            if segment_name is not None:
+                if segment_name.startswith('*'):
+                    dispatch_matches[segment_name] = tuple(segments[i:])
+                    break
+                dispatch_matches[segment_name] = segment
+
+        if isinstance(node, PathMap):
+            # a route may end at this node
+            node = node.plain_segments.get(self._root_marker, node)
+            if isinstance(node, PathMap):
+                raise self._build_exception(
+                    kwargs=kwargs, reason='partial_path'
+                )
+        match_info.update(dispatch_matches)
+        return node
+
+    def match_many(self, requests):
+        """
+        Match a batch of requests against the router.
+
+        Requests are grouped by shared leading path segments so that each node
+        of the trie is looked up once per distinct segment in the batch.
+
+        Args:
+            requests (Iterable[Dict[str, Any]]): the keyword arguments of each
+            match.
+
+        Returns:
+            List[Union[RouteMatch, Exception]]: a result for each request, in
+            input order. Requests which fail to match give the exception that
+            `match` would have raised.
+        """
+        requests = list(requests)
+        if (self.engine is not None or self._match_cache is not None or
+                self._miss_cache is not None or
+                self._instrumentation is not None):
+            return super().match_many(requests)
+
+        results = [None] * len(requests)
+        found = {}
+        group = []
+        path_map = self.map
+        for index, kwargs in enumerate(requests):
+            try:
+                segments = self._get_segments(self._get_path_arg(kwargs))
+            except Exception as err:
+                results[index] = err
+                continue
+            if segments:
+                group.append((index, segments))
+            else:
+                found[index] = (self._root_target(path_map), {})
+        self._traverse_map_many(path_map, 0, group, {}, found)
+
+        for index, kwargs in enumerate(requests):
+            if results[index] is not None:
+                continue
+            target, dispatch_matches = found.get(index, (None, None))
+            if isinstance(target, PathMap):
+                # a route may end at this node
+                target = target.plain_segments.get(self._root_marker, target)
+            if dispatch_matches is None:
+                results[index] = self._build_exception(
+                    kwargs=kwargs, reason='no_segment'
+                )
+                continue
+            if isinstance(target, PathMap):
+                # traversal did not lead to a leaf node
+                results[index] = self._build_exception(
+                    kwargs=kwargs, reason='partial_path'
+                )
+                continue
+            try:
+                results[index] = self._complete(
+                    target, dict(dispatch_matches), kwargs
+                )
+            except Exception as err:
+                results[index] = err
+        return results
+
+    def _traverse_map_many(self, node, depth, group, dispatch_matches, found):
+        # group holds (index, segments) pairs which share their first `depth`
+        # segments
+        branches = {}
+        for item in group:
+            segments = item[1]
+            if len(segments) == depth:
+                found[item[0]] = (node, dispatch_matches)
+            else:
+                branches.setdefault(segments[depth], []).append(item)
+
+        for segment, branch in branches.items():
+            try:
+                next_node, segment_name = node.get(segment)
+            except KeyError:
+                continue  # no entry in `found` marks a miss
+
+            if segment_name is None:
+                next_matches = dispatch_matches
+            elif segment_name.startswith('*'):
+                # this node collects following path segments
+                for index, segments in branch:
+                    next_matches = dispatch_matches.copy()
+                    next_matches[segment_name] = tuple(segments[depth:])
+                    found[index] = (next_node, next_matches)
+                continue
+            else:
+                next_matches = dispatch_matches.copy()
+                next_matches[segment_name] = segment
+
+            if isinstance(next_node, PathMap):
+                self._traverse_map_many(
+                    next_node, depth + 1, branch, next_matches, found
+                )
+            else:
+                for index, segments in branch:
+                    if len(segments) == depth + 1:
+                        found[index] = (next_node, next_matches)
+
+    @staticmethod
+    def _get_path_prefix(path):
+        prefix = path.lstrip('/').partition('/')[0]
+        if not prefix or prefix == '.' or '..' in path:
+            # the leading segment may be changed by normalization
+            return None
+        return prefix
+
+    def _record_miss(self, miss_cache, path, segments):
+        dead_prefix = None
+        if segments and self._get_path_prefix(path) == segments[0]:
+            try:
+                self.map.get(segments[0])
+            except KeyError:
+                dead_prefix = segments[0]
+        miss_cache.add(path, dead_prefix)
+
+    def _get_segments(self, path):
+        segments = get_path_segments(path)
+        if self.decode:
+            decode_segments(segments)
+        return segments
 
     def _get_path_arg(self, kwarg_dict):
         path = kwarg_dict.get(self.path_key)
@@ -84,15 +816,88 @@ class URIPathRouter(AbstractRouter):
             )
         return path
 
+    def validate(self):
+        """
+        Report routes which can never be matched, or which rely on precedence.
+
+        Conflicts are reported with one of the following kinds:
+        - "shadowed": a parameterized segment which is never reached because a
+          preceding sibling matches every value it could match.
+        - "overlap": a plain segment which a parameterized sibling also
+          matches; the plain segment takes precedence. Also a parameterized
+          segment which a preceding sibling may match too, where the routes
+          below the two differ: paths matched by both only reach the routes
+          below the preceding sibling, since matching does not backtrack.
+
+        Returns:
+            List[RouteConflict]
+        """
+        conflicts = []
+        self._validate_node(self.map, '', conflicts)
+        return conflicts
+
+    def _validate_node(self, node, prefix, conflicts):
+        regex_entries = list(node.regex_segments.items())
+        root_marker = self._root_marker
+        for position, (key, value) in enumerate(regex_entries):
+            path = prefix + '/' + format_segment(*key)
+            for other_key, other_value in regex_entries[:position]:
+                if _shadows(*(other_key + key)):
+                    conflicts.append(RouteConflict(
+                        'shadowed', path,
+                        'always matched by ' + format_segment(*other_key)
+                    ))
+                    break
+                if (not segments_disjoint(other_key[1].pattern,
+                                          key[1].pattern) and
+                        not _route_suffixes(value, root_marker) <=
+                        _route_suffixes(other_value, root_marker)):
+                    conflicts.append(RouteConflict(
+                        'overlap', path,
+                        'also matched by ' + format_segment(*other_key)
+                    ))
+                    break
+            if isinstance(value, PathMap):
+                self._validate_node(value, path, conflicts)
+
+        for plain_segment, value in list(node.plain_segments.items()):
+            path = prefix + '/' + plain_segment
+            for key, _ in regex_entries:
+                if (plain_segment != root_marker and
+                        key[1].fullmatch(plain_segment)):
+                    conflicts.append(RouteConflict(
+                        'overlap', path,
+                        'also matched by ' + format_segment(*key)
+                    ))
+                    break
+            if isinstance(value, PathMap):
+                self._validate_node(value, path, conflicts)
+
     def traverse_map(self, path_segments):
+        # `self.map` is read once, since updates replace it with a new version
+        path_map = self.map
         if not path_segments:
-            target, _ = self.map.get(self._root_marker)
-            return target, {}
-        return self._traverse_map(path_segments)
+            return self._root_target(path_map), {}
+        if self.engine == 'backtracking':
+            return self._backtrack_map(path_map, path_segments)
+        return self._traverse_map(path_map, path_segments)
+
+    def _root_target(self, path_map):
+        # The root path is looked up as a single empty segment, as with every
+        # engine, so a parameterized segment matching "" serves it; its value
+        # is not captured. The root node is returned if no route ends there.
+        try:
+            node, _ = path_map.get(self._root_marker)
+        except KeyError:
+            return path_map
+        if isinstance(node, PathMap):
+            # a route may end at this node
+            node = node.plain_segments.get(self._root_marker, node)
+        return node
 
-    def _traverse_map(self, path_segments):
+    def _traverse_map(self, path_map, path_segments):
         # initial node and match state
-        node = self.map
+        node = path_map
         dispatch_matches = {}
 
         for i, segment in enumerate(path_segments):
@@ -114,33 +919,449 @@ class URIPathRouter(AbstractRouter):
                 else:
                     dispatch_matches[segment_name] = segment
 
+        if isinstance(node, PathMap):
+            # a route may end at this node
+            node = node.plain_segments.get(self._root_marker, node)
         return node, dispatch_matches
 
+    def _backtrack_map(self, path_map, path_segments):
+        dispatch_matches = {}
+        target = self._backtrack_node(
+            path_map, path_segments, 0, dispatch_matches
+        )
+        if target is _NOT_FOUND:
+            raise KeyError(path_segments)
+        return target, dispatch_matches
+
+    def _backtrack_node(self, node, path_segments, index, dispatch_matches):
+        # Depth-first search of the children matching each segment. Each node
+        # of the trie is only ever reached at one index of the path, so the
+        # search visits every node at most once and failures need not be
+        # memoized.
+        # Returns the target, or else a node the path ended on, as
+        # `_traverse_map` does, or else `_NOT_FOUND`.
+        if index == len(path_segments):
+            if isinstance(node, PathMap):
+                # a route may end at this node
+                return node.plain_segments.get(self._root_marker, node)
+            return node
+        if not isinstance(node, PathMap):
+            # we have more segments to process but we ran out of nodes
+            return _NOT_FOUND
+
+        segment = path_segments[index]
+        ended_on_node = _NOT_FOUND
+        for next_node, segment_name in node.candidates(segment):
+            if segment_name is None:
+                found = self._backtrack_node(
+                    next_node, path_segments, index + 1, dispatch_matches
+                )
+            elif segment_name.startswith('*'):
+                # this node collects following path segments
+                found = self._backtrack_node(
+                    next_node, path_segments, len(path_segments),
+                    dispatch_matches
+                )
+                if found is not _NOT_FOUND and not isinstance(found, PathMap):
+                    dispatch_matches[segment_name] = tuple(
+                        path_segments[index:]
+                    )
+            else:
+                previous = dispatch_matches.get(segment_name, _NOT_FOUND)
+                dispatch_matches[segment_name] = segment
+                found = self._backtrack_node(
+                    next_node, path_segments, index + 1, dispatch_matches
+                )
+                if found is _NOT_FOUND or isinstance(found, PathMap):
+                    if previous is _NOT_FOUND:
+                        del dispatch_matches[segment_name]
+                    else:
+                        dispatch_matches[segment_name] = previous
+            if isinstance(found, PathMap):
+                # keep looking for a route
+                ended_on_node = found
+            elif found is not _NOT_FOUND:
+                return found
+        return ended_on_node
+
+
+class URLTemplate:
+    """
+    A plan for building the path of a route.
+
+    The route is parsed once into literal text and parameter slots, so building
+    a path only fills in the slots and joins the parts.
+
+    Args:
+        path (str): the route path, as given to `URIPathRouter.connect`.
+    """
+    __slots__ = ('path', 'parts', 'slots')
+
+    def __init__(self, path):
+        self.path = path
+        parts = []
+        slots = []
+        literal = ''
+        for segment in get_path_segments(path):
+            literal += '/'
+            if segment.startswith('{'):
+                segment_name, re_pattern = make_regex_tuple(segment)
+                parts.append(literal)
+                slots.append((len(parts), segment_name.lstrip('*'), re_pattern,
+                              segment_name.startswith('*')))
+                parts.append(None)
+                literal = ''
+            else:
+                literal += segment
+        parts.append(literal or ('' if slots else '/'))
+        self.parts = parts
+        self.slots = tuple(slots)
+
+    def __reduce__(self):
+        return URLTemplate, (self.path,)
+
+    def build(self, params, validate=False):
+        parts = self.parts[:]
+        for index, param_name, re_pattern, is_glob in self.slots:
+            try:
+                value = params[param_name]
+            except KeyError:
+                raise KeyError(
+                    'Missing value for {!r} in route {!r}'.format(
+                        param_name, self.path
+                    )
+                ) from None
+            if not is_glob:
+                segments = [str(value)]
+            elif isinstance(value, str):
+                segments = value.split('/')
+            else:
+                segments = [str(segment) for segment in value]
+            if not segments or '' in segments:
+                # empty segments are dropped when the path is matched
+                raise ValueError(
+                    'Empty path segment in value {!r} for {!r} '
+                    'in route {!r}'.format(value, param_name, self.path)
+                )
+            parts[index] = '/'.join(
+                self._format(segment, param_name, re_pattern, validate)
+                for segment in segments
+            )
+        return ''.join(parts)
+
+    @staticmethod
+    def _format(segment, param_name, re_pattern, validate):
+        if validate and not re_pattern.fullmatch(segment):
+            raise ValueError(
+                'Value {!r} for {!r} does not match {!r}'.format(
+                    segment, param_name, re_pattern.pattern
+                )
+            )
+        if _NEEDS_QUOTING.search(segment):
+            return quote(segment, safe=_URL_SAFE)
+        if segment == '.' or segment == '..':
+            # dot segments would be removed when the path is matched
+            return segment.replace('.', '%2E')
+        return segment
+
 
 class PathMap:
+    """
+    A node of the path trie.
+
+    Nodes are kept small since a route table holds one per distinct route
+    prefix: attributes live in slots, nodes without children of a kind share
+    one empty read-only table, and segment strings are interned so that equal
+    segments of different routes are stored once.
+    """
+    __slots__ = (
+        'plain_segments', 'regex_segments', '_regex_lookup', '_regex_last',
+        '_regex_index'
+    )
+
     def __init__(self):
-        self.plain_segments = {}
-        self.regex_segments = {}
+        self.plain_segments = _EMPTY_TABLE
+        self.regex_segments = _EMPTY_TABLE
+        self._regex_lookup = None
+        self._regex_last = None  # the last key of regex_segments, if known
+        # regex_segments keys by name and pattern source, for many siblings
+        self._regex_index = None
+
+    def __getstate__(self):
+        # the shared empty table and regex lookups are not pickled, and
+        # patterns are kept as their source; frozen nodes are frozen again
+        # when loaded
+        frozen = any(
+            type(table) is MappingProxyType and table is not _EMPTY_TABLE
+            for table in (self.plain_segments, self.regex_segments)
+        )
+        regex_segments = [
+            (segment_name, re_pattern.pattern, value)
+            for (segment_name, re_pattern), value
+            in self.regex_segments.items()
+        ]
+        return dict(self.plain_segments), regex_segments, frozen
+
+    def __setstate__(self, state):
+        plain_segments, regex_segments, frozen = state
+        self.plain_segments = {
+            intern(segment): value for segment, value in plain_segments.items()
+        } if plain_segments else _EMPTY_TABLE
+        make_pattern = re.compile if frozen else DeferredPattern
+        self.regex_segments = {
+            (intern(segment_name), make_pattern(pattern)): value
+            for segment_name, pattern, value in regex_segments
+        } if regex_segments else _EMPTY_TABLE
+        self._regex_lookup = None
+        self._regex_last = None
+        self._regex_index = None
+        if frozen:
+            if plain_segments:
+                self.plain_segments = MappingProxyType(self.plain_segments)
+            if regex_segments:
+                self.regex_segments = MappingProxyType(self.regex_segments)
+                self._regex_lookup = self._make_regex_lookup()
 
     def get(self, name):
         try:
             return self.plain_segments[name], None
         except KeyError:
-            for (segment_name, re_pattern), value in self.regex_segments.items():
-                match = re_pattern.match(name)
-                if match and match.group(0) == name:
-                    return value, segment_name
+            if self.regex_segments:
+                if self._regex_lookup is None:
+                    self._regex_lookup = self._make_regex_lookup()
+                found = self._regex_lookup(name)
+                if found is not None:
+                    return found
             raise
 
     def set(self, name, value):
         if name.startswith('{'):
-            regex_tuple = make_regex_tuple(name)
-            self.regex_segments[regex_tuple] = value
+            segment_name, re_pattern = make_regex_tuple(name)
+            regex_tuple = self._find_regex_tuple(segment_name, re_pattern)
+            if regex_tuple is None:
+                regex_tuple = (intern(segment_name), re_pattern)
+                index = self._regex_index
+                if index is not None:
+                    index[segment_name, re_pattern.pattern] = regex_tuple
+            if self.regex_segments is _EMPTY_TABLE:
+                self.regex_segments = {}
+            last = self._regex_last
+            if last is None and self.regex_segments:
+                last = list(self.regex_segments)[-1]
+            if regex_tuple in self.regex_segments:
+                self.regex_segments[regex_tuple] = value
+            elif last is None or (
+                segment_specificity(*regex_tuple) >= segment_specificity(*last)
+            ):
+                self.regex_segments[regex_tuple] = value
+                last = regex_tuple
+            else:
+                # order from most to least specific; sorting is stable so that
+                # registration order is kept between equally specific segments
+                self.regex_segments[regex_tuple] = value
+                self.regex_segments = dict(sorted(
+                    self.regex_segments.items(),
+                    key=lambda item: segment_specificity(*item[0])
+                ))
+            self._regex_last = last
+            self._regex_lookup = None
+        else:
+            if self.plain_segments is _EMPTY_TABLE:
+                self.plain_segments = {}
+            self.plain_segments[intern(name)] = value
+
+    def freeze(self):
+        """
+        Make this node and its descendants read-only.
+
+        Regex lookups are built and deferred patterns compiled now, so that
+        `get` no longer writes to frozen nodes.
+        """
+        if type(self.regex_segments) is dict:
+            self.regex_segments = MappingProxyType({
+                (segment_name, re.compile(re_pattern.pattern)): value
+                for (segment_name, re_pattern), value
+                in self.regex_segments.items()
+            })
+            self._regex_lookup = self._make_regex_lookup()
+            self._regex_last = None
+            self._regex_index = None
+        if type(self.plain_segments) is dict:
+            self.plain_segments = MappingProxyType(self.plain_segments)
+        for table in (self.plain_segments, self.regex_segments):
+            for value in table.values():
+                if isinstance(value, PathMap):
+                    value.freeze()
+
+    def copy(self):
+        """
+        Copy this node, sharing its children with the copy.
+        """
+        node = PathMap()
+        if self.plain_segments:
+            node.plain_segments = dict(self.plain_segments)
+        if self.regex_segments:
+            node.regex_segments = dict(self.regex_segments)
+            node._regex_last = self._regex_last
+            if self._regex_index is not None:
+                node._regex_index = dict(self._regex_index)
+        return node
+
+    def _replacement(self):
+        # a copy to be published in place of this node, which is not changed
+        # again, so its regex index moves to the copy instead of being copied
+        index, self._regex_index = self._regex_index, None
+        node = self.copy()
+        node._regex_index = index
+        return node
+
+    def remove(self, name):
+        """
+        Remove the value stored for a segment definition.
+
+        Raises:
+            KeyError: if no value is stored for the segment.
+        """
+        if name.startswith('{'):
+            regex_tuple = self._find_regex_tuple(*make_regex_tuple(name))
+            if regex_tuple is None:
+                raise KeyError(name)
+            del self.regex_segments[regex_tuple]
+            if self._regex_index is not None:
+                del self._regex_index[regex_tuple[0], regex_tuple[1].pattern]
+            if not self.regex_segments:
+                self.regex_segments = _EMPTY_TABLE
+            self._regex_lookup = None
+            self._regex_last = None
         else:
-            self.plain_segments[name] = value
+            if name not in self.plain_segments:
+                raise KeyError(name)
+            del self.plain_segments[name]
+            if not self.plain_segments:
+                self.plain_segments = _EMPTY_TABLE
+
+    def candidates(self, name):
+        """
+        Find every value whose segment matches a path segment.
+
+        Yields:
+            Tuples of a value and the matched segment name (None for plain
+            segments), in order of precedence.
+        """
+        if name in self.plain_segments:
+            yield self.plain_segments[name], None
+        for (segment_name, re_pattern), value in self.regex_segments.items():
+            if re_pattern.fullmatch(name):
+                yield value, segment_name
+
+    def child(self, name):
+        """
+        Get the value stored for a segment definition, e.g. "users" or
+        "{id:\\d+}".
+
+        Unlike `get`, this does not match path segments against patterns.
+
+        Returns:
+            The stored value, or None.
+        """
+        if name.startswith('{'):
+            regex_tuple = self._find_regex_tuple(*make_regex_tuple(name))
+            if regex_tuple is None:
+                return None
+            return self.regex_segments[regex_tuple]
+        return self.plain_segments.get(name)
+
+    def definition(self, segment_name, value):
+        """
+        Find the definition of the parameterized segment which holds a value.
+
+        Returns:
+            str: the segment as it would be written in a route, e.g.
+            "{id:\\d+}".
+        """
+        for (name, re_pattern), candidate in self.regex_segments.items():
+            if name == segment_name and candidate is value:
+                return format_segment(name, re_pattern)
+        raise KeyError(segment_name)
+
+    def _make_regex_lookup(self):
+        return make_regex_lookup(
+            (segment_name, re_pattern, value)
+            for (segment_name, re_pattern), value
+            in self.regex_segments.items()
+        )
+
+    def _find_regex_tuple(self, segment_name, re_pattern):
+        # keys are compared by pattern source, since they may hold compiled or
+        # deferred patterns; only nodes with many siblings keep an index
+        index = self._regex_index
+        source = re_pattern.pattern
+        if index is None:
+            if len(self.regex_segments) < _REGEX_INDEX_MIN_SIZE:
+                for name, pattern in self.regex_segments:
+                    if name == segment_name and pattern.pattern == source:
+                        return name, pattern
+                return None
+            index = self._regex_index = {
+                (name, pattern.pattern): (name, pattern)
+                for name, pattern in self.regex_segments
+            }
+        return index.get((segment_name, source))
+
+
+def segment_specificity(segment_name, re_pattern):
+    """
+    Rank a parameterized segment for lookup order, most specific first.
+
+    Returns:
+        0 for segments with their own pattern, 1 for segments using the default
+        pattern and 2 for remainder (`{*rest}`) segments.
+    """
+    if segment_name.startswith('*'):
+        return 2
+    if re_pattern.pattern == _DEFAULT_SEGMENT_PATTERN:
+        return 1
+    return 0
+
+
+def format_segment(segment_name, re_pattern):
+    """
+    Format a parameterized segment as it would be written in a route.
+    """
+    if re_pattern.pattern == _DEFAULT_SEGMENT_PATTERN:
+        return '{' + segment_name + '}'
+    return '{' + segment_name + ':' + re_pattern.pattern + '}'
+
+
+def _shadows(name, re_pattern, other_name, other_pattern):
+    # whether a segment is never reached after an earlier sibling
+    if re_pattern.pattern == other_pattern.pattern:
+        return True
+    return (
+        not name.startswith('*') and
+        matches_every_segment(re_pattern.pattern)
+    )
+
+
+def _route_suffixes(value, root_marker):
+    # the segment definitions of each route below a trie value
+    if not isinstance(value, PathMap):
+        return {()}
+    suffixes = set()
+    for segment, child in list(value.plain_segments.items()):
+        if segment == root_marker:
+            suffixes.add(())
+            continue
+        for suffix in _route_suffixes(child, root_marker):
+            suffixes.add((segment,) + suffix)
+    for (segment_name, re_pattern), child in value.regex_segments.items():
+        segment = format_segment(segment_name, re_pattern)
+        for suffix in _route_suffixes(child, root_marker):
+            suffixes.add((segment,) + suffix)
+    return suffixes
 
 
-def make_regex_tuple(name_pattern, default='[^/]+'):
+def make_regex_tuple(name_pattern, default=_DEFAULT_SEGMENT_PATTERN):
     pattern_pair = name_pattern.strip('{}').split(':', maxsplit=1)
     name = pattern_pair[0]
     if len(pattern_pair) == 1:
@@ -0,0 +1,412 @@
+"""
+Static analysis of the regex patterns of parameterized path segments.
+
+These find what segments a pattern can match without running it, so that
+sibling patterns can be combined, pre-filtered with string checks, checked for
+overlaps and reordered.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+import re
+import sys
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+
+_UNCOMBINABLE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)')
+SegmentFilter = namedtuple(
+    'SegmentFilter', ['prefix', 'suffix', 'min_length', 'max_length']
+)
+
+
+class DeferredPattern:
+    """
+    A regex pattern which is compiled when it is first used.
+
+    Args:
+        pattern (str): the regex source.
+    """
+    __slots__ = ('pattern', '_compiled')
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self._compiled = None
+
+    def __getattr__(self, name):
+        if self._compiled is None:
+            self._compiled = re.compile(self.pattern)
+        return getattr(self._compiled, name)
+
+    def __eq__(self, other):
+        return getattr(other, 'pattern', None) == self.pattern
+
+    def __hash__(self):
+        return hash(self.pattern)
+
+    def __repr__(self):
+        return 'DeferredPattern({!r})'.format(self.pattern)
+
+    def __reduce__(self):
+        return DeferredPattern, (self.pattern,)
+
+
+@lru_cache(maxsize=1024)
+def matches_every_segment(pattern):
+    """
+    Check whether a regex pattern fully matches any non-empty path segment,
+    e.g. "[^/]+" or ".*". "." is taken to match anything, since paths hold no
+    newlines.
+    """
+    try:
+        items = list(sre_parse.parse(pattern))
+    except (re.error, RecursionError, OverflowError):
+        return False
+    if len(items) != 1 or items[0][0] not in _REPEATS:
+        return False
+    min_count, max_count, repeated = items[0][1]
+    repeated = list(repeated)
+    if min_count > 1 or max_count != sre_parse.MAXREPEAT or len(repeated) != 1:
+        return False
+    op, value = repeated[0]
+    slash = ord('/')
+    return (
+        op is sre_parse.ANY or
+        (op is sre_parse.NOT_LITERAL and value == slash) or
+        (op is sre_parse.IN and value == [
+            (sre_parse.NEGATE, None), (sre_parse.LITERAL, slash)
+        ])
+    )
+
+
+@lru_cache(maxsize=1024)
+def make_segment_filter(pattern):
+    """
+    Find what any segment fully matching a regex pattern must look like.
+
+    Args:
+        pattern (str): a regex pattern source.
+
+    Returns:
+        A `SegmentFilter` of the literal text a match must start and end with
+        and its length bounds; `max_length` is None if it is unbounded.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+        min_length, max_length = parsed.getwidth()
+    except (re.error, RecursionError, OverflowError):
+        return SegmentFilter('', '', 0, None)
+    if max_length >= sre_parse.MAXREPEAT:
+        max_length = None
+    if _pattern_flags(parsed) & re.IGNORECASE:
+        return SegmentFilter('', '', min_length, max_length)
+    items = list(parsed)
+    prefix = _literal_run(items)
+    suffix = _literal_run(reversed(items))[::-1]
+    return SegmentFilter(prefix, suffix, min_length, max_length)
+
+
+def _pattern_flags(parsed):
+    # `SubPattern.state` was named `pattern` before Python 3.8
+    state = getattr(parsed, 'state', None) or parsed.pattern
+    return state.flags
+
+
+def _literal_run(items):
+    characters = []
+    for op, value in items:
+        if op is not sre_parse.LITERAL:
+            break
+        characters.append(chr(value))
+    return ''.join(characters)
+
+
+_ASCII_DIGITS = ((0x30, 0x39),)
+_ASCII_WORD = ((0x30, 0x39), (0x41, 0x5a), (0x5f, 0x5f), (0x61, 0x7a))
+_NON_ASCII = ((0x80, sys.maxunicode),)
+_CATEGORY_RANGES = {
+    # non-ASCII characters are included, since str patterns match Unicode
+    # digits and word characters
+    sre_parse.CATEGORY_DIGIT: _ASCII_DIGITS + _NON_ASCII,
+    sre_parse.CATEGORY_WORD: _ASCII_WORD + _NON_ASCII,
+}
+_REPEATS = tuple(
+    getattr(sre_parse, name)
+    for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(sre_parse, name)
+)
+
+
+@lru_cache(maxsize=1024)
+def _edge_ranges(pattern):
+    # code point ranges which the first and the last character of a full match
+    # fall in, each None if they could not be determined
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, RecursionError, OverflowError):
+        return None, None
+    if _pattern_flags(parsed) & re.IGNORECASE:
+        return None, None
+    return _item_edge_ranges(parsed, False), _item_edge_ranges(parsed, True)
+
+
+def _item_edge_ranges(items, last):
+    items = reversed(list(items)) if last else items
+    for op, value in items:
+        if op is sre_parse.AT:
+            continue  # anchors do not consume characters
+        if op is sre_parse.LITERAL:
+            return ((value, value),)
+        if op is sre_parse.IN:
+            return _set_ranges(value)
+        if op in _REPEATS:
+            min_count, _, repeated = value
+            return _item_edge_ranges(repeated, last) if min_count else None
+        if op is sre_parse.SUBPATTERN:
+            _, add_flags, _, subpattern = value
+            if add_flags & re.IGNORECASE:
+                return None
+            return _item_edge_ranges(subpattern, last)
+        if op is sre_parse.BRANCH:
+            ranges = ()
+            for branch in value[1]:
+                branch_ranges = _item_edge_ranges(branch, last)
+                if branch_ranges is None:
+                    return None
+                ranges += branch_ranges
+            return ranges
+        return None
+    return None
+
+
+def _set_ranges(members):
+    ranges = ()
+    for op, value in members:
+        if op is sre_parse.LITERAL:
+            ranges += ((value, value),)
+        elif op is sre_parse.RANGE:
+            ranges += (value,)
+        elif op is sre_parse.CATEGORY and value in _CATEGORY_RANGES:
+            ranges += _CATEGORY_RANGES[value]
+        else:
+            return None
+    return ranges
+
+
+def _ranges_overlap(ranges, other_ranges):
+    return any(
+        low <= other_high and other_low <= high
+        for low, high in ranges for other_low, other_high in other_ranges
+    )
+
+
+def segments_disjoint(pattern, other_pattern):
+    """
+    Check whether no path segment can fully match both of two regex patterns.
+
+    This compares the literal prefixes, suffixes and length bounds of the
+    patterns (see `make_segment_filter`) and the characters their matches can
+    start and end with. It may fail to prove that patterns are disjoint, but
+    never claims it wrongly.
+
+    Args:
+        pattern (str): a regex pattern source.
+
+        other_pattern (str): another regex pattern source.
+
+    Returns:
+        bool: True if the patterns are known to be disjoint.
+    """
+    segment_filter = make_segment_filter(pattern)
+    other_filter = make_segment_filter(other_pattern)
+    if not (segment_filter.prefix.startswith(other_filter.prefix) or
+            other_filter.prefix.startswith(segment_filter.prefix)):
+        return True
+    if not (segment_filter.suffix.endswith(other_filter.suffix) or
+            other_filter.suffix.endswith(segment_filter.suffix)):
+        return True
+    if (segment_filter.max_length is not None and
+            segment_filter.max_length < other_filter.min_length):
+        return True
+    if (other_filter.max_length is not None and
+            other_filter.max_length < segment_filter.min_length):
+        return True
+    edge_ranges = zip(_edge_ranges(pattern), _edge_ranges(other_pattern))
+    for ranges, other_ranges in edge_ranges:
+        if (ranges is not None and other_ranges is not None and
+                not _ranges_overlap(ranges, other_ranges)):
+            return True
+    return False
+
+
+def order_by_hits(patterns, hits):
+    """
+    Order patterns by decreasing hit counts where this can not change which
+    pattern matches a segment first.
+
+    Two patterns keep their relative order unless `segments_disjoint` proves
+    that no segment matches both. Patterns with equal hit counts keep their
+    relative order.
+
+    Args:
+        patterns (Sequence[str]): regex pattern sources in order of precedence.
+
+        hits (Sequence[int]): the hit count of each pattern.
+
+    Returns:
+        List[int]: the indexes of the patterns in their new order.
+    """
+    remaining = list(range(len(patterns)))
+    order = []
+    while remaining:
+        best = None
+        for position, index in enumerate(remaining):
+            # a pattern may move ahead of the unplaced patterns before it only
+            # if it is disjoint from each of them
+            movable = all(
+                segments_disjoint(patterns[earlier], patterns[index])
+                for earlier in remaining[:position]
+            )
+            if movable and (best is None or hits[index] > hits[best]):
+                best = index
+        order.append(best)
+        remaining.remove(best)
+    return order
+
+
+def merge_segment_filters(filters):
+    """
+    Combine segment filters into checks which every match of any of them
+    passes.
+
+    Args:
+        filters (Iterable[SegmentFilter]): filters of sibling patterns.
+
+    Returns:
+        A tuple of (prefixes, suffixes, min_length, max_length) for use with
+        `str.startswith`, `str.endswith` and a chained comparison, or None if
+        the checks would reject nothing but empty segments.
+    """
+    filters = tuple(filters)
+    if not filters:
+        return None
+    prefixes = tuple({segment_filter.prefix for segment_filter in filters})
+    suffixes = tuple({segment_filter.suffix for segment_filter in filters})
+    min_length = min(segment_filter.min_length for segment_filter in filters)
+    max_lengths = [segment_filter.max_length for segment_filter in filters]
+    max_length = float('inf') if None in max_lengths else max(max_lengths)
+    if '' in prefixes:
+        prefixes = ('',)
+    if '' in suffixes:
+        suffixes = ('',)
+    if (prefixes == suffixes == ('',) and min_length <= 1 and
+            max_length == float('inf')):
+        return None
+    return prefixes, suffixes, min_length, max_length
+
+
+def make_regex_lookup(regex_entries):
+    """
+    Build a function which finds the first regex entry fully matching a
+    segment.
+
+    Entries are combined into a single alternation so a lookup costs one regex
+    call however many entries there are. Only the source of each pattern is
+    used for this, so entries need not be compiled individually. Patterns
+    which can not be safely combined (inline flags, backreferences, clashing
+    group names) fall back to testing each entry in turn. Segments which can
+    not match any entry, given the literal prefixes, suffixes and length
+    bounds of the patterns (see `make_segment_filter`), are rejected without
+    running a regex.
+
+    Args:
+        regex_entries (Iterable[Tuple[str, Pattern, Any]]): (segment name,
+        pattern, value) triples in order of precedence.
+
+    Returns:
+        A function taking a path segment and returning a tuple of the matched
+        value and segment name, or None if no entry matches.
+    """
+    entries = tuple(regex_entries)
+    filters = [
+        make_segment_filter(re_pattern.pattern) for _, re_pattern, _ in entries
+    ]
+    targets = {}
+    alternatives = []
+    for position, (segment_name, re_pattern, value) in enumerate(entries):
+        if _UNCOMBINABLE.search(re_pattern.pattern):
+            return _make_linear_regex_lookup(entries, filters)
+        group_name = '_pyger_{}'.format(position)
+        alternatives.append(
+            '(?P<{}>{})'.format(group_name, re_pattern.pattern)
+        )
+        targets[group_name] = (value, segment_name)
+    try:
+        fullmatch = re.compile('|'.join(alternatives)).fullmatch
+    except re.error:
+        return _make_linear_regex_lookup(entries, filters)
+
+    merged_filter = merge_segment_filters(filters)
+    if merged_filter is None:
+        def regex_lookup(segment):
+            match = fullmatch(segment)
+            if match is None:
+                return None
+            return targets[match.lastgroup]
+        return regex_lookup
+
+    prefixes, suffixes, min_length, max_length = merged_filter
+
+    def filtered_regex_lookup(segment):
+        # cheap string checks before calling into `re`
+        if not (
+            min_length <= len(segment) <= max_length and
+            segment.startswith(prefixes) and segment.endswith(suffixes)
+        ):
+            return None
+        match = fullmatch(segment)
+        if match is None:
+            return None
+        return targets[match.lastgroup]
+    return filtered_regex_lookup
+
+
+def _make_linear_regex_lookup(entries, filters=()):
+    if not any(_is_selective(segment_filter) for segment_filter in filters):
+        def regex_lookup(segment):
+            for segment_name, re_pattern, value in entries:
+                if re_pattern.fullmatch(segment):
+                    return value, segment_name
+            return None
+        return regex_lookup
+
+    filtered_entries = tuple(
+        (segment_name, re_pattern, value) + segment_filter
+        for (segment_name, re_pattern, value), segment_filter
+        in zip(entries, filters)
+    )
+
+    def regex_lookup(segment):
+        length = len(segment)
+        for (segment_name, re_pattern, value, prefix, suffix, min_length,
+             max_length) in filtered_entries:
+            if length < min_length or (
+                max_length is not None and length > max_length
+            ):
+                continue
+            if not segment.startswith(prefix) or not segment.endswith(suffix):
+                continue
+            if re_pattern.fullmatch(segment):
+                return value, segment_name
+        return None
+    return regex_lookup
+
+
+def _is_selective(segment_filter):
+    return (
+        segment_filter.prefix or segment_filter.suffix or
+        segment_filter.min_length > 1 or segment_filter.max_length is not None
+    )
@@ -8,5 +8,9 @@ class UnitRouter(AbstractRouter):
     def _resolve(self, match_info, **kwargs):
         return self.handler, match_info.copy()
 
+    def _resolve_into(self, match_info, kwargs):
+        return self.handler
+
     def connect(self, handler, **kwargs):
         self.handler = handler
+        self._routes_changed()
@@ -0,0 +1,121 @@
+"""
+Routing pipelines for high-volume streams of requests.
+
+Both `route` and `aroute` lazily yield `(request, result)` pairs where the
+result is a `RouteMatch`, or the exception raised while matching that request.
+Any router tree can be used since requests are matched through
+`AbstractRouter.match_many`.
+"""
+
+from itertools import islice
+import asyncio
+
+
+_END = object()
+
+
+def _as_kwargs(request):
+    return request
+
+
+def route(router, requests, buffer_size=256, get_kwargs=None):
+    """
+    Route an iterable of requests.
+
+    Requests are read from the source only as results are consumed, at most
+    `buffer_size` at a time, and each chunk is matched as one batch.
+
+    Args:
+        router (AbstractRouter): the root of the routing tree.
+
+        requests (Iterable[Any]): the requests to route.
+
+        buffer_size (int, optional): the maximum number of requests read ahead
+        of the consumer. Defaults to 256.
+
+        get_kwargs (Callable[[Any], Dict[str, Any]], optional): a function
+        returning the match keyword arguments for a request. Defaults to using
+        each request as the keyword arguments mapping.
+
+    Yields:
+        Tuple[Any, Union[RouteMatch, Exception]]
+    """
+    if buffer_size < 1:
+        raise ValueError('buffer_size must be at least 1')
+    get_kwargs = get_kwargs or _as_kwargs
+    requests = iter(requests)
+    while True:
+        chunk = list(islice(requests, buffer_size))
+        if not chunk:
+            return
+        results = router.match_many([get_kwargs(request) for request in chunk])
+        yield from zip(chunk, results)
+
+
+async def aroute(router, requests, buffer_size=256, get_kwargs=None):
+    """
+    Route an iterable or asynchronous iterable of requests.
+
+    Asynchronous sources are read by a separate task into a queue holding at
+    most `buffer_size` requests, so a slow consumer applies backpressure to the
+    source. Whatever has been queued when the consumer asks for more is matched
+    as one batch.
+
+    Args:
+        router (AbstractRouter): the root of the routing tree.
+
+        requests (Union[Iterable[Any], AsyncIterable[Any]]): the requests to
+        route.
+
+        buffer_size (int, optional): the maximum number of requests read ahead
+        of the consumer. Defaults to 256.
+
+        get_kwargs (Callable[[Any], Dict[str, Any]], optional): a function
+        returning the match keyword arguments for a request. Defaults to using
+        each request as the keyword arguments mapping.
+
+    Yields:
+        Tuple[Any, Union[RouteMatch, Exception]]
+    """
+    if not hasattr(requests, '__aiter__'):
+        for pair in route(router, requests, buffer_size, get_kwargs):
+            yield pair
+        return
+
+    if buffer_size < 1:
+        raise ValueError('buffer_size must be at least 1')
+    get_kwargs = get_kwargs or _as_kwargs
+    queue = asyncio.Queue(maxsize=buffer_size)
+    errors = []
+
+    async def produce():
+        try:
+            async for request in requests:
+                await queue.put(request)
+        except asyncio.CancelledError:
+            raise  # an Exception before Python 3.8
+        except Exception as err:
+            errors.append(err)
+        await queue.put(_END)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        finished = False
+        while not finished:
+            chunk = [await queue.get()]
+            while len(chunk) < buffer_size and not queue.empty():
+                chunk.append(queue.get_nowait())
+            if chunk[-1] is _END:
+                finished = True
+                chunk.pop()
+            results = router.match_many(
+                [get_kwargs(request) for request in chunk]
+            )
+            for pair in zip(chunk, results):
+                yield pair
+        if errors:
+            raise errors[0]
+    finally:
+        producer.cancel()
+        # let the producer finish cancelling, so no task is left pending
+        await asyncio.wait([producer])
@@ -0,0 +1,135 @@
+from pyger.aio import AsyncAbstractRouter, amatch, memoize
+from pyger.base import MatchError, RouteMatch
+from pyger.routers import HTTPMethodRouter, URIPathRouter
+import asyncio
+
+
+calls = []
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+@memoize
+async def load_tenant(host):
+    calls.append(host)
+    await asyncio.sleep(0)
+    return host.split('.')[0]
+
+
+class TenantRouter(AsyncAbstractRouter):
+    def __init__(self):
+        self.map = {}
+        self.exc_class = MatchError
+
+    def connect(self, handler, tenant=None):
+        self.map[tenant] = handler
+
+    async def _resolve(self, match_info, **kwargs):
+        tenant = await load_tenant(kwargs['host'])
+        try:
+            handler = self.map[tenant]
+        except KeyError:
+            raise self._build_exception(kwargs=kwargs)
+        updated = match_info.copy()
+        updated['tenant'] = tenant
+        return handler, updated
+
+
+class AuditRouter(AsyncAbstractRouter):
+    def __init__(self, handler):
+        self.handler = handler
+
+    def connect(self, handler, **kwargs):
+        self.handler = handler
+
+    async def _resolve(self, match_info, **kwargs):
+        updated = match_info.copy()
+        return await self._resolve_into(updated, kwargs), updated
+
+    async def _resolve_into(self, match_info, kwargs):
+        match_info['audited'] = await load_tenant(kwargs['host'])
+        return self.handler
+
+
+def make_tree():
+    methods = HTTPMethodRouter()
+    methods.connect(AuditRouter('get_item'), method='GET')
+    tenants = TenantRouter()
+    tenants.connect(methods, tenant='acme')
+    paths = URIPathRouter()
+    paths.connect(tenants, path='/items/{id}')
+    return paths
+
+
+def test_amatch_mixed_tree():
+    del calls[:]
+    match = run(amatch(make_tree(), path='/items/1', method='GET', host='acme.example'))
+    assert match == RouteMatch(
+        target='get_item',
+        match_info={'id': '1', 'tenant': 'acme', 'audited': 'acme'}
+    )
+    assert calls == ['acme.example']
+
+
+def test_amatch_memo_is_per_match():
+    del calls[:]
+    tree = make_tree()
+    for _ in range(2):
+        run(amatch(tree, path='/items/1', method='GET', host='acme.example'))
+    assert calls == ['acme.example', 'acme.example']
+
+
+def test_amatch_miss():
+    try:
+        run(amatch(make_tree(), path='/items/1', method='GET', host='other.example'))
+    except MatchError as err:
+        assert isinstance(err._pyger['router'], TenantRouter)
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+
+
+def test_amatch_sync_tree():
+    router = URIPathRouter()
+    router.connect('index', path='/')
+    assert run(amatch(router, path='/')).target == 'index'
+
+
+def test_async_router_amatch_method():
+    router = AuditRouter('target')
+    match = run(router.amatch(host='x.example'))
+    assert match == RouteMatch(target='target', match_info={'audited': 'x'})
+
+
+def test_async_router_sync_match():
+    try:
+        make_tree().match(path='/items/1', method='GET', host='acme.example')
+    except TypeError:
+        pass
+    else:
+        assert False, 'Expected TypeError; no error raised.'
+
+
+def test_memoize_outside_match():
+    del calls[:]
+    run(load_tenant('a.example'))
+    run(load_tenant('a.example'))
+    assert calls == ['a.example', 'a.example']
+
+
+def test_amatch_does_not_await_sync_targets():
+    async def match_future():
+        future = asyncio.get_event_loop().create_future()
+        future.set_result('result')
+        router = URIPathRouter()
+        router.connect(future, path='/future')
+        return future, await amatch(router, path='/future')
+
+    future, match = run(match_future())
+    assert match.target is future
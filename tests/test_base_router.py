@@ -1,4 +1,6 @@
-from pyger.base import AbstractRouter
+from pyger.base import AbstractRouter, MatchError, Miss, RouteMatch
+from pyger.routers import UnitRouter, URIPathRouter
+import sys
 
 
 class MockRouter(AbstractRouter):
@@ -17,3 +19,124 @@ def test_base_router_exception_builder():
         'foo': 'bar',
         'baz': 2
     }
+
+
+def test_base_router_match_error_context_is_lazy():
+    router = MockRouter()
+    exc = router._build_exception(kwargs={'a': 1}, reason='gone')
+    assert isinstance(exc, MatchError)
+    assert '_pyger' not in exc.__dict__
+    assert exc._pyger == {'router': router, 'kwargs': {'a': 1}, 'reason': 'gone'}
+    assert exc._pyger is exc._pyger
+    assert not hasattr(MatchError(), '_pyger')
+
+
+class RecordingRouter(AbstractRouter):
+    def __init__(self, key, handler):
+        self.key = key
+        self.handler = handler
+
+    def connect(self, handler, **kwargs):
+        self.handler = handler
+
+    def _resolve(self, match_info, **kwargs):
+        updated = match_info.copy()
+        updated[self.key] = kwargs[self.key]
+        return self.handler, updated
+
+
+class CustomMatchRouter(RecordingRouter):
+    def match(self, _match_info=None, **kwargs):
+        found = super().match(_match_info=_match_info, **kwargs)
+        return RouteMatch(target=('custom', found.target), match_info=found.match_info)
+
+
+def test_base_router_nested_dispatch():
+    router = RecordingRouter('a', RecordingRouter('b', RecordingRouter('c', 'target')))
+    match = router.match(a=1, b=2, c=3)
+    assert match == RouteMatch(target='target', match_info={'a': 1, 'b': 2, 'c': 3})
+
+
+def test_base_router_nested_dispatch_does_not_recurse():
+    router = handler = 'target'
+    for i in range(sys.getrecursionlimit() + 100):
+        router = RecordingRouter('key', router)
+    assert router.match(key=0).target == handler
+
+
+def test_base_router_nested_dispatch_respects_match_override():
+    router = RecordingRouter('a', CustomMatchRouter('b', 'target'))
+    match = router.match(a=1, b=2)
+    assert match == RouteMatch(target=('custom', 'target'), match_info={'a': 1, 'b': 2})
+
+
+def test_base_router_legacy_resolve_adapter():
+    router = RecordingRouter('a', 'target')
+    match_info = {'before': True}
+    assert router._resolve_into(match_info, {'a': 1}) == 'target'
+    assert match_info == {'before': True, 'a': 1}
+
+
+def test_base_router_match_does_not_modify_passed_match_info():
+    router = RecordingRouter('a', 'target')
+    match_info = {}
+    match = router.match(_match_info=match_info, a=1)
+    assert match.match_info == {'a': 1}
+    assert match_info == {}
+
+
+def test_base_router_legacy_router_in_builtin_tree():
+    paths = URIPathRouter()
+    paths.connect(RecordingRouter('tenant', 'target'), path='/items/{id}')
+    match = paths.match(path='/items/3', tenant='acme')
+    assert match == RouteMatch(target='target', match_info={'id': '3', 'tenant': 'acme'})
+
+
+def test_base_router_match_many():
+    router = RecordingRouter('a', 'target')
+    results = router.match_many([{'a': 1}, {}, {'a': 2}])
+    assert results[0] == RouteMatch(target='target', match_info={'a': 1})
+    assert isinstance(results[1], KeyError)
+    assert results[2] == RouteMatch(target='target', match_info={'a': 2})
+
+
+def test_base_router_connect_many():
+    router = UnitRouter(None)
+    router.connect_many([('a', {}), ('b', {})])
+    assert router.match().target == 'b'
+
+
+class MissingRouter(AbstractRouter):
+    def connect(self, handler, **kwargs):
+        pass
+
+    def _resolve(self, match_info, **kwargs):
+        raise self._build_exception(kwargs=kwargs, reason='gone')
+
+
+def test_base_router_try_match():
+    router = RecordingRouter('a', RecordingRouter('b', 'target'))
+    assert router.try_match(a=1, b=2) == RouteMatch(target='target', match_info={'a': 1, 'b': 2})
+
+    inner = MissingRouter()
+    miss = RecordingRouter('a', inner).try_match(a=1)
+    assert isinstance(miss, Miss)
+    assert not miss
+    assert miss.router is inner
+    assert miss.reason == 'gone'
+    assert miss.kwargs == {'a': 1}
+    assert isinstance(miss.exception(), MatchError)
+
+    try:
+        router.try_match(a=1)
+    except KeyError:
+        pass
+    else:
+        assert False, 'Expected KeyError; no error raised.'
+
+
+def test_base_router_try_match_custom_match_node():
+    router = RecordingRouter('a', CustomMatchRouter('b', 'target'))
+    assert router.try_match(a=1, b=2) == RouteMatch(
+        target=('custom', 'target'), match_info={'a': 1, 'b': 2}
+    )
@@ -0,0 +1,184 @@
+from pyger.base import MatchError
+from pyger.routers import HTTPMethodRouter, URIPathRouter
+from pyger.routers.flat import FlatPathRouter, flatten
+import mmap
+
+
+ROUTES = [
+    ('/', 'root'),
+    ('/articles/{category}/{id:[0-9]+}', 'article'),
+    ('/files/{*rest}', 'files'),
+    ('/café/menu', 'menu'),
+    ('/users/{name}/profile', 'profile'),
+]
+
+
+def make_router():
+    router = URIPathRouter()
+    for path, handler in ROUTES:
+        router.connect(handler, path=path)
+    return router
+
+
+def assert_same_result(router, flat_router, path):
+    try:
+        expected = router.match(path=path)
+    except MatchError:
+        try:
+            flat_router.match(path=path)
+        except MatchError:
+            return
+        assert False, 'Expected MatchError for %r' % path
+    assert flat_router.match(path=path) == expected
+
+
+def test_flat_router_matches_path_router():
+    router = make_router()
+    flat_router = FlatPathRouter.from_router(router)
+    paths = [
+        '/', '/articles/books/12', '/articles/books/x', '/articles/books',
+        '/files/a/b/c', '/files', '/café/menu', '/cafe/menu',
+        '/users/x/profile', '/users/x/profile/more', '/nothing', '/users/../',
+    ]
+    for path in paths:
+        assert_same_result(router, flat_router, path)
+
+
+def test_flat_router_many_siblings():
+    router = URIPathRouter()
+    for i in range(500):
+        router.connect(i, path='/item%d' % i)
+    flat_router = FlatPathRouter.from_router(router)
+    for i in range(500):
+        assert flat_router.match(path='/item%d' % i).target == i
+    try:
+        flat_router.match(path='/item500')
+    except MatchError:
+        pass
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+
+
+def test_flat_router_deduplicates_handlers():
+    router = URIPathRouter()
+    router.connect('same', path='/a')
+    router.connect('same', path='/b')
+    _, handlers = flatten(router)
+    assert handlers == ['same']
+
+
+def test_flat_router_memory_mapped_table():
+    table, handlers = flatten(make_router())
+    shared = mmap.mmap(-1, len(table))
+    shared[:] = table
+    flat_router = FlatPathRouter(shared, handlers)
+    assert flat_router.match(path='/articles/books/12') == (
+        'article', {'category': 'books', 'id': '12'}
+    )
+
+
+def test_flat_router_nested_routers():
+    methods = HTTPMethodRouter()
+    methods.connect('get', method='GET')
+    router = URIPathRouter()
+    router.connect(methods, path='/items/{id}')
+    flat_router = FlatPathRouter.from_router(router)
+    assert flat_router.match(path='/items/1', method='GET') == ('get', {'id': '1'})
+
+
+def test_flat_router_handler_count_mismatch():
+    table, handlers = flatten(make_router())
+    try:
+        FlatPathRouter(table, handlers[:-1])
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError; no error raised.'
+
+
+def test_flat_router_is_read_only():
+    flat_router = FlatPathRouter.from_router(make_router())
+    try:
+        flat_router.connect('x', path='/x')
+    except TypeError:
+        pass
+    else:
+        assert False, 'Expected TypeError; no error raised.'
+
+
+def test_flat_router_decode():
+    router = URIPathRouter(decode=True)
+    router.connect('menu', path='/café/{item}')
+    flat_router = FlatPathRouter.from_router(router)
+    assert flat_router.match(path='/caf%C3%A9/cr%C3%AApe') == ('menu', {'item': 'crêpe'})
+
+
+def test_flat_router_shared_prefixes_and_route_ends():
+    router = URIPathRouter()
+    router.connect('a', path='/a')
+    router.connect('ab', path='/a/b')
+    router.connect('ac', path='/a/c')
+    flat_router = FlatPathRouter.from_router(router)
+    for path in ('/a', '/a/b', '/a/c', '/a/d', '/b'):
+        assert_same_result(router, flat_router, path)
+
+
+def test_flat_router_bytes_paths():
+    router = make_router()
+    flat_router = FlatPathRouter.from_router(router)
+    for path in (b'/caf\xc3\xa9/menu', b'/users/\xff/profile', b'/\xff', b'/files/\xff/a'):
+        assert_same_result(router, flat_router, path)
+    assert flat_router.match(path=b'/users/\xff/profile').match_info == {'name': '\udcff'}
+    miss = flat_router.try_match(path=b'/\xff')
+    assert not miss
+    assert miss.reason == router.try_match(path=b'/\xff').reason
+
+
+def test_flat_router_root_path_engines():
+    for paths in (['/{x:.*}'], ['/{x:.*}', '/{x:.*}/a'], ['/{x}'], ['/a']):
+        flat_router = None
+        for engine in URIPathRouter.engines:
+            router = URIPathRouter(engine=engine)
+            for path in paths:
+                router.connect(path, path=path)
+            if flat_router is None:
+                flat_router = FlatPathRouter.from_router(router)
+            assert_same_result(router, flat_router, '/')
+
+    router = URIPathRouter()
+    router.connect('any', path='/{x:.*}')
+    assert router.match(path='/').target == 'any'
+    assert router.match_many([{'path': '/'}])[0].target == 'any'
+    router.enable_instrumentation()
+    assert router.match(path='/').target == 'any'
+
+
+def test_flat_router_miss_reasons_engines():
+    misses = [
+        ('/', 'partial_path'),
+        ('/a', 'partial_path'),
+        ('/a/12', 'partial_path'),
+        ('/x', 'no_segment'),
+        ('/a/b/c', 'no_segment'),
+        ('/a/b/c/d', 'no_segment'),
+    ]
+    routers = []
+    for engine in URIPathRouter.engines:
+        for instrumented in (False, True):
+            router = URIPathRouter(engine=engine)
+            router.connect('b', path='/a/b')
+            router.connect('c', path='/a/{x:[0-9]+}/c')
+            if instrumented:
+                router.enable_instrumentation()
+            routers.append(router)
+    routers.append(FlatPathRouter.from_router(routers[0]))
+
+    for router in routers:
+        for path, reason in misses:
+            assert router.try_match(path=path).reason == reason, (router, path)
+            try:
+                router.match(path=path)
+            except MatchError as err:
+                assert err._pyger['reason'] == reason, (router, path)
+            else:
+                assert False, 'Expected MatchError for %r' % path
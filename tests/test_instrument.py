@@ -0,0 +1,115 @@
+from pyger.base import MatchError
+from pyger.instrument import Instrumentation
+from pyger.routers import HTTPMethodRouter, URIPathRouter
+import itertools
+
+
+def make_tree():
+    methods = HTTPMethodRouter()
+    methods.connect('get_article', method='GET')
+    paths = URIPathRouter()
+    paths.connect(methods, path=r'/articles/{id:\d+}')
+    paths.connect('files', path='/files/{*rest}')
+    return paths, methods
+
+
+def fake_clock():
+    return itertools.count(step=10).__next__
+
+
+def match_or_miss(router, **kwargs):
+    try:
+        return router.match(**kwargs)
+    except MatchError as err:
+        return err
+
+
+def test_instrumentation_counts_hits():
+    router, methods = make_tree()
+    instrumentation = router.enable_instrumentation(Instrumentation(clock=fake_clock()))
+    instrumentation.label(router, 'paths')
+    instrumentation.label(methods, 'methods')
+
+    match = router.match(path='/articles/12', method='GET')
+    assert match.target == 'get_article'
+    assert match.match_info == {'id': '12'}
+    assert router.match(path='/files/a/b').match_info == {'*rest': ('a', 'b')}
+
+    stats = instrumentation.as_dict()
+    assert stats['matches'] == 2
+    assert stats['misses'] == 0
+    assert stats['routers']['paths']['resolves'] == 2
+    assert stats['routers']['methods']['resolves'] == 1
+    assert stats['nodes']['paths'] == {
+        '/articles': {'hits': 1, 'lookup_ns': 10},
+        r'/articles/{id:\d+}': {'hits': 1, 'lookup_ns': 10},
+        '/files': {'hits': 1, 'lookup_ns': 10},
+        '/files/{*rest}': {'hits': 1, 'lookup_ns': 10},
+    }
+
+
+def test_instrumentation_miss_reasons():
+    router, _ = make_tree()
+    instrumentation = router.enable_instrumentation()
+    for kwargs in (
+        {'path': '/missing', 'method': 'GET'},
+        {'path': '/articles/x', 'method': 'GET'},
+        {'path': '/articles', 'method': 'GET'},
+        {'path': '/articles/12', 'method': 'DELETE'},
+    ):
+        assert isinstance(match_or_miss(router, **kwargs), MatchError)
+    try:
+        router.match(method='GET')
+    except TypeError:
+        pass
+    else:
+        assert False, 'Expected TypeError; no error raised.'
+
+    assert instrumentation.misses == 5
+    assert instrumentation.miss_reasons == {
+        'no_segment': 2, 'partial_path': 1, 'method_not_allowed': 1, 'error': 1
+    }
+
+
+def test_instrumentation_matches_like_uninstrumented_router():
+    for engine in URIPathRouter.engines:
+        plain, _ = make_tree()
+        plain.engine = engine
+        instrumented, _ = make_tree()
+        instrumented.engine = engine
+        instrumented.enable_instrumentation()
+        for path in ('/articles/1', '/articles/1/x', '/files', '/files/a', '/', '/x'):
+            expected = match_or_miss(plain, path=path, method='GET')
+            found = match_or_miss(instrumented, path=path, method='GET')
+            if isinstance(expected, MatchError):
+                assert isinstance(found, MatchError)
+                if engine is None:
+                    assert found._pyger['reason'] == expected._pyger['reason']
+            else:
+                assert found == expected
+
+
+def test_instrumentation_match_many():
+    router, _ = make_tree()
+    instrumentation = router.enable_instrumentation()
+    results = router.match_many([
+        {'path': '/articles/1', 'method': 'GET'},
+        {'path': '/files/a', 'method': 'GET'},
+        {'path': '/missing', 'method': 'GET'},
+    ])
+    assert [result.target for result in results[:2]] == ['get_article', 'files']
+    assert isinstance(results[2], MatchError)
+    assert instrumentation.matches == 2
+    assert instrumentation.miss_reasons == {'no_segment': 1}
+    assert instrumentation.node_hits(router)['/files'] == 1
+
+
+def test_instrumentation_disable_and_reset():
+    router, _ = make_tree()
+    instrumentation = router.enable_instrumentation()
+    router.match(path='/articles/1', method='GET')
+    instrumentation.reset()
+    assert instrumentation.as_dict()['routers'] == {}
+    router.disable_instrumentation()
+    router.match(path='/articles/1', method='GET')
+    assert instrumentation.matches == 0
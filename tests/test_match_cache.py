@@ -0,0 +1,93 @@
+from pyger.cache import MatchCache
+from pyger.routers import HTTPMethodRouter, URIPathRouter
+
+
+def make_tree():
+    methods = HTTPMethodRouter()
+    methods.connect('get_article', method='GET')
+    paths = URIPathRouter()
+    paths.connect(methods, path='/articles/{id}')
+    return paths, methods
+
+
+def test_match_cache_hits_and_misses():
+    router, _ = make_tree()
+    cache = router.enable_cache(maxsize=10)
+    first = router.match(path='/articles/1', method='GET')
+    second = router.match(path='/articles/1', method='GET')
+    assert first == second
+    assert first.match_info == {'id': '1'}
+    assert cache.info() == {'hits': 1, 'misses': 1, 'maxsize': 10, 'size': 1}
+
+
+def test_match_cache_returns_independent_match_info():
+    router, _ = make_tree()
+    router.enable_cache()
+    router.match(path='/articles/1', method='GET').match_info['id'] = 'changed'
+    assert router.match(path='/articles/1', method='GET').match_info == {'id': '1'}
+
+
+def test_match_cache_evicts_least_recently_used():
+    router = URIPathRouter()
+    router.connect('handler', path='/{name}')
+    cache = router.enable_cache(maxsize=2)
+    router.match(path='/a')
+    router.match(path='/b')
+    router.match(path='/a')
+    router.match(path='/c')
+    assert len(cache) == 2
+    router.match(path='/a')
+    assert cache.hits == 2
+    router.match(path='/b')
+    assert cache.misses == 4
+
+
+def test_match_cache_invalidated_by_nested_connect():
+    router, methods = make_tree()
+    cache = router.enable_cache()
+    assert router.match(path='/articles/1', method='GET').target == 'get_article'
+    methods.map.pop('GET')
+    methods.connect('any_article', method='*')
+    assert router.match(path='/articles/1', method='GET').target == 'any_article'
+    assert cache.hits == 0
+
+
+def test_match_cache_kept_when_other_routers_change():
+    router, methods = make_tree()
+    cache = router.enable_cache()
+    router.match(path='/articles/1', method='GET')
+    other = HTTPMethodRouter()
+    other.connect('other', method='GET')
+    URIPathRouter().connect('other', path='/other')
+    router.match(path='/articles/1', method='GET')
+    assert cache.hits == 1
+
+    router.connect('index', path='/')
+    router.match(path='/articles/1', method='GET')
+    assert cache.hits == 1
+    router.match(path='/articles/1', method='GET')
+    assert cache.hits == 2
+
+
+def test_match_cache_unhashable_arguments():
+    router = HTTPMethodRouter()
+    router.connect('handler', method='*')
+    cache = router.enable_cache()
+    assert router.match(method='GET', body=[]).target == 'handler'
+    assert len(cache) == 0
+
+
+def test_match_cache_disabled():
+    router, _ = make_tree()
+    router.enable_cache()
+    router.disable_cache()
+    assert router.match(path='/articles/1', method='GET').target == 'get_article'
+
+
+def test_match_cache_invalid_size():
+    try:
+        MatchCache(maxsize=0)
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError; no error raised.'
@@ -1,4 +1,5 @@
-from pyger.routers.http_methods import HTTPMethodRouter
+from pyger.base import MatchError
+from pyger.routers.http_methods import AllowedMethods, HTTPMethodRouter
 
 
 def test_method_router_connect_resolve():
@@ -60,7 +61,99 @@ def test_method_not_found():
     except Exception as err:
         assert err._pyger == {
             'router': router,
-            'kwargs': {'method': 'PATCH'}
+            'kwargs': {'method': 'PATCH'},
+            'reason': 'method_not_allowed',
+            'allowed': frozenset(),
+            'allow': ''
         }
     else:
         assert False, 'Expected MatchError; no error raised.'
+
+
+def test_method_router_try_match():
+    router = HTTPMethodRouter()
+    router.connect('get', method='GET')
+    assert router.try_match(method='GET').target == 'get'
+    miss = router.try_match(method='PATCH')
+    assert not miss
+    assert miss.reason == 'method_not_allowed'
+    assert miss.router is router
+    assert miss.exception()._pyger == {
+        'router': router,
+        'kwargs': {'method': 'PATCH'},
+        'reason': 'method_not_allowed',
+        'allowed': frozenset({'GET'}),
+        'allow': 'GET'
+    }
+
+
+def test_method_not_found_is_not_chained():
+    router = HTTPMethodRouter()
+    try:
+        router.match(method='PATCH')
+    except MatchError as err:
+        assert err.__cause__ is None
+        assert err.__context__ is None
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+
+
+def test_method_router_allowed_methods():
+    router = HTTPMethodRouter()
+    assert router.allowed == frozenset()
+    assert router.allow == ''
+    router.connect('post', method='POST')
+    router.connect('get', method='GET')
+    assert router.allowed == frozenset({'GET', 'POST'})
+    assert router.allow == 'GET, POST'
+    assert set(router.keys()) == {'GET', 'POST'}
+
+    miss = router.try_match(method='PUT')
+    assert miss.extra == {'allowed': router.allowed, 'allow': 'GET, POST'}
+
+
+def test_method_router_implicit_head():
+    router = HTTPMethodRouter(implicit_head=True)
+    router.connect('get', method='GET')
+    assert router.allowed == frozenset({'GET', 'HEAD'})
+    assert router.match(method='HEAD').target == 'get'
+    router.connect('head', method='HEAD')
+    assert router.match(method='HEAD').target == 'head'
+
+    router = HTTPMethodRouter()
+    router.connect('get', method='GET')
+    assert router.allowed == frozenset({'GET'})
+    assert not router.try_match(method='HEAD')
+
+
+def test_method_router_implicit_options():
+    router = HTTPMethodRouter(implicit_options=True)
+    router.connect('get', method='GET')
+    target = router.match(method='OPTIONS').target
+    assert target == AllowedMethods(frozenset({'GET', 'OPTIONS'}), 'GET, OPTIONS')
+    assert target.allow == router.allow
+
+    router.connect('options', method='OPTIONS')
+    assert router.match(method='OPTIONS').target == 'options'
+    assert not HTTPMethodRouter().try_match(method='OPTIONS')
+
+
+def test_method_router_exact_method_before_wildcard():
+    router = HTTPMethodRouter(implicit_options=True)
+    router.connect('any', method='*')
+    router.connect('get', method='GET')
+    assert router.match(method='GET').target == 'get'
+    assert router.match(method='HEAD').target == 'any'
+    assert router.match(method='OPTIONS').target == 'any'
+    assert router.allowed == frozenset({'GET'})
+
+
+def test_method_router_missing_method_key():
+    router = HTTPMethodRouter()
+    router.connect('get', method='GET')
+    try:
+        router.match(verb='GET')
+    except TypeError as err:
+        assert err.args[0] == "Expected keyword argument 'method' but received ['verb']"
+    else:
+        assert False, 'Expected TypeError; no error raised.'
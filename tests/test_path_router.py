@@ -1,6 +1,18 @@
-from pyger.routers.path import PathMap, URIPathRouter, make_regex_tuple
+from pyger.routers.path import (
+    PathMap, RouteConflict, URIPathRouter, get_path_segments, make_regex_tuple
+)
+from pyger.routers.patterns import (
+    DeferredPattern, SegmentFilter, make_regex_lookup, make_segment_filter,
+    merge_segment_filters, order_by_hits, segments_disjoint
+)
 from pyger.base import MatchError
+from pyger.routers.http_methods import HTTPMethodRouter
+import copy
+import io
+import json
+import pickle
 import re
+import threading
 
 
 # PathMap tests
@@ -299,3 +311,1033 @@ def test_path_router_double_dots_as_part_of_path_segments():
     router.connect(sentinel, path='/foo/..bar/baz')
     match = router.match(path='/foo/..bar/baz')
     assert match.target is sentinel
+
+
+def test_path_map_regex_registration_order_precedence():
+    mapping = PathMap()
+    digits = object()
+    anything = object()
+    mapping.set(r'{id:\d+}', digits)
+    mapping.set('{name}', anything)
+    assert mapping.get('123') == (digits, 'id')
+    assert mapping.get('abc') == (anything, 'name')
+
+
+def test_path_map_regex_siblings_replace_and_remove():
+    for count in (3, 40):
+        mapping = PathMap()
+        for i in range(count):
+            mapping.set('{p%d:a%d-[0-9]+}' % (i, i), i)
+        mapping.set('{p1:a1-[0-9]+}', 'replaced')
+        assert len(mapping.regex_segments) == count
+        assert mapping.child('{p1:a1-[0-9]+}') == 'replaced'
+        assert mapping.get('a1-5') == ('replaced', 'p1')
+        mapping.remove('{p2:a2-[0-9]+}')
+        assert mapping.child('{p2:a2-[0-9]+}') is None
+        try:
+            mapping.remove('{p2:a2-[0-9]+}')
+        except KeyError:
+            pass
+        else:
+            assert False, 'Expected KeyError'
+        # only nodes with many siblings keep an index
+        assert (mapping._regex_index is None) == (count == 3)
+
+
+def test_path_map_regex_alternation_full_match():
+    mapping = PathMap()
+    sentinel = object()
+    mapping.set('{ext:a|ab}', sentinel)
+    assert mapping.get('ab') == (sentinel, 'ext')
+
+
+def test_path_map_regex_with_groups():
+    mapping = PathMap()
+    first = object()
+    second = object()
+    mapping.set('{first:(a)(b)c}', first)
+    mapping.set('{second:(?P<inner>x+)}', second)
+    assert mapping.get('abc') == (first, 'first')
+    assert mapping.get('xxx') == (second, 'second')
+
+
+def test_path_map_regex_lookup_rebuilt_after_set():
+    mapping = PathMap()
+    mapping.set(r'{id:\d+}', 'digits')
+    assert mapping.get('1')[0] == 'digits'
+    mapping.set('{name:[a-z]+}', 'letters')
+    assert mapping.get('abc')[0] == 'letters'
+
+
+def test_make_regex_lookup_uncombinable_patterns():
+    lookup = make_regex_lookup([
+        ('pair', re.compile(r'(.)\1'), 'pair'),
+        ('named', re.compile('(?i)abc'), 'named'),
+        ('other', re.compile('.+'), 'other'),
+    ])
+    assert lookup('zz') == ('pair', 'pair')
+    assert lookup('ABC') == ('named', 'named')
+    assert lookup('xyz') == ('other', 'other')
+
+
+def test_make_regex_lookup_miss():
+    lookup = make_regex_lookup([('id', re.compile(r'\d+'), 'digits')])
+    assert lookup('abc') is None
+
+
+def test_path_router_miss_cache_rejects_known_paths():
+    router = URIPathRouter()
+    router.connect(object(), path='/foo/{bar}/baz')
+    miss_cache = router.enable_miss_cache()
+    for _ in range(3):
+        try:
+            router.match(path='/foo/x/qux')
+        except MatchError:
+            pass
+        else:
+            assert False, 'Expected MatchError; no error raised.'
+    assert miss_cache.recorded == 1
+    assert miss_cache.short_circuited == 2
+
+
+def test_path_router_miss_cache_rejects_dead_prefixes():
+    router = URIPathRouter()
+    router.connect(object(), path='/foo/bar')
+    miss_cache = router.enable_miss_cache()
+    for path in ('/wp-admin/install.php', '/wp-admin/setup.php', '//wp-admin/x'):
+        try:
+            router.match(path=path)
+        except MatchError:
+            pass
+        else:
+            assert False, 'Expected MatchError; no error raised.'
+    assert miss_cache.info()['prefixes'] == 1
+    assert miss_cache.short_circuited == 2
+
+
+def test_path_router_miss_cache_ignores_dot_segments():
+    router = URIPathRouter()
+    sentinel = object()
+    router.connect(sentinel, path='/foo')
+    router.enable_miss_cache()
+    try:
+        router.match(path='/dead/end')
+    except MatchError:
+        pass
+    assert router.match(path='/dead/../foo').target is sentinel
+
+
+def test_path_router_miss_cache_invalidated_by_connect():
+    router = URIPathRouter()
+    router.connect(object(), path='/foo')
+    miss_cache = router.enable_miss_cache()
+    try:
+        router.match(path='/bar')
+    except MatchError:
+        pass
+    sentinel = object()
+    router.connect(sentinel, path='/bar')
+    assert router.match(path='/bar').target is sentinel
+    assert miss_cache.short_circuited == 0
+
+
+def test_path_router_miss_cache_partial_path():
+    router = URIPathRouter()
+    router.connect(object(), path='/foo/bar')
+    miss_cache = router.enable_miss_cache()
+    for _ in range(2):
+        try:
+            router.match(path='/foo')
+        except MatchError:
+            pass
+    assert miss_cache.info()['prefixes'] == 0
+    assert miss_cache.short_circuited == 1
+
+
+def test_path_router_resolve_into_updates_match_info_in_place():
+    router = URIPathRouter()
+    sentinel = object()
+    router.connect(sentinel, path='/objects/{id}')
+    match_info = {'outer': 1}
+    assert router._resolve_into(match_info, {'path': '/objects/2'}) is sentinel
+    assert match_info == {'outer': 1, 'id': '2'}
+
+
+def test_path_router_legacy_resolve_copies_match_info():
+    router = URIPathRouter()
+    router.connect(object(), path='/objects/{id}')
+    match_info = {}
+    _, updated = router._resolve(match_info, path='/objects/2')
+    assert updated == {'id': '2'}
+    assert match_info == {}
+
+
+def test_path_router_match_many():
+    router = URIPathRouter()
+    router.connect('root', path='/')
+    router.connect('item', path=r'/api/items/{id:\d+}')
+    router.connect('file', path='/files/{*rest}')
+    results = router.match_many([
+        {'path': '/api/items/1'},
+        {'path': '/api/items/x'},
+        {'path': '/'},
+        {'path': '/api/items/2'},
+        {'path': '/files/a/b'},
+        {'path': '/api/items'},
+        {'patch': '/api'},
+        {'path': '/api/items/3/extra'},
+    ])
+    assert results[0] == ('item', {'id': '1'})
+    assert isinstance(results[1], MatchError)
+    assert results[1]._pyger['kwargs'] == {'path': '/api/items/x'}
+    assert results[2] == ('root', {})
+    assert results[3] == ('item', {'id': '2'})
+    assert results[4] == ('file', {'*rest': ('a', 'b')})
+    assert isinstance(results[5], MatchError)
+    assert isinstance(results[6], TypeError)
+    assert isinstance(results[7], MatchError)
+
+
+def test_path_router_match_many_missing_root():
+    router = URIPathRouter()
+    router.connect('item', path='/items')
+    result, = router.match_many([{'path': '/'}])
+    assert isinstance(result, MatchError)
+
+
+def test_path_router_match_many_miss_reasons():
+    router = URIPathRouter()
+    router.connect('b', path='/a/b')
+    router.connect('item', path=r'/items/{id:\d+}')
+    requests = [{'path': p} for p in ('/', '/a', '/a/c', '/items/x', '/a/b/c')]
+    batched = router.match_many(requests)
+    for request, result in zip(requests, batched):
+        try:
+            router.match(**request)
+        except MatchError as err:
+            assert isinstance(result, MatchError)
+            assert result._pyger['reason'] == err._pyger['reason']
+        else:
+            assert False, 'Expected MatchError; no error raised.'
+    assert [result._pyger['reason'] for result in batched] == [
+        'partial_path', 'partial_path', 'no_segment', 'no_segment', 'no_segment'
+    ]
+
+
+def test_path_router_match_many_nested_routers():
+    inner = HTTPMethodRouter()
+    inner.connect('get', method='GET')
+    router = URIPathRouter()
+    router.connect(inner, path='/objects/{id}')
+    results = router.match_many([
+        {'path': '/objects/1', 'method': 'GET'},
+        {'path': '/objects/2', 'method': 'PUT'},
+    ])
+    assert results[0] == ('get', {'id': '1'})
+    assert isinstance(results[1], MatchError)
+    assert results[1]._pyger['router'] is inner
+
+
+def test_path_router_match_many_same_as_match():
+    router = URIPathRouter()
+    router.connect('a', path='/a/{x}/b')
+    router.connect('c', path='/c')
+    router.enable_miss_cache()
+    requests = [{'path': p} for p in ('/a/1/b', '/c', '/a/1', '/a/../c')]
+    batched = router.match_many(requests)
+    for request, result in zip(requests, batched):
+        try:
+            assert router.match(**request) == result
+        except MatchError:
+            assert isinstance(result, MatchError)
+
+
+def make_dump_router():
+    router = URIPathRouter(path_key='uri')
+    router.connect(json.dumps, uri='/')
+    router.connect(json.loads, uri=r'/objects/{id:\d+}/raw')
+    router.connect(re.escape, uri='/files/{*rest}')
+    router.connect(PathMap.get, uri='/docs/index')
+    return router
+
+
+def test_path_router_dump_load_round_trip():
+    buffer = io.StringIO()
+    make_dump_router().dump(buffer)
+    buffer.seek(0)
+    router = URIPathRouter.load(buffer)
+    assert router.path_key == 'uri'
+    assert router.match(uri='/').target is json.dumps
+    assert router.match(uri='/objects/12/raw') == (json.loads, {'id': '12'})
+    assert router.match(uri='/files/a/b') == (re.escape, {'*rest': ('a', 'b')})
+    assert router.match(uri='/docs/index').target is PathMap.get
+
+
+def test_path_router_load_defers_regex_compilation():
+    buffer = io.StringIO()
+    make_dump_router().dump(buffer)
+    buffer.seek(0)
+    router = URIPathRouter.load(buffer)
+    (_, pattern), _ = router.map.plain_segments['objects'].regex_segments.popitem()
+    assert isinstance(pattern, DeferredPattern)
+    assert pattern._compiled is None
+    assert pattern.fullmatch('123')
+    assert pattern._compiled is not None
+
+
+def test_path_router_dump_custom_references():
+    handlers = {'index': object()}
+    router = URIPathRouter()
+    router.connect(handlers['index'], path='/index')
+    buffer = io.StringIO()
+    router.dump(buffer, reference=lambda handler: 'index')
+    buffer.seek(0)
+    loaded = URIPathRouter.load(buffer, resolve=handlers.get, raises=KeyError)
+    assert loaded.match(path='/index').target is handlers['index']
+    assert loaded.exc_class is KeyError
+
+
+def test_path_router_dump_unreferenceable_handler():
+    router = URIPathRouter()
+    router.connect(lambda: None, path='/index')
+    try:
+        router.dump(io.StringIO())
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError; no error raised.'
+
+
+def test_path_router_load_invalid_format():
+    try:
+        URIPathRouter.load(io.StringIO('{"format": "other"}'))
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError; no error raised.'
+
+
+def test_get_path_segments_fast_path():
+    assert get_path_segments('/a/b/c/') == ['a', 'b', 'c']
+    assert get_path_segments('') == []
+    assert get_path_segments('///') == []
+    assert get_path_segments('/file.json') == ['file.json']
+
+
+def test_get_path_segments_normalization():
+    assert get_path_segments('/a//b/./c') == ['a', 'b', 'c']
+    assert get_path_segments('./a/../../b') == ['b']
+    assert get_path_segments('/a/.hidden/..b') == ['a', '.hidden', '..b']
+
+
+def test_get_path_segments_bytes():
+    assert get_path_segments(b'/caf\xc3\xa9/./menu/') == ['café', 'menu']
+    assert get_path_segments(bytearray(b'/a/../b')) == ['b']
+    assert get_path_segments(memoryview(b'//a/b')) == ['a', 'b']
+    assert get_path_segments(b'/\xff') == ['\udcff']
+
+
+def test_path_router_bytes_path():
+    router = URIPathRouter()
+    sentinel = object()
+    router.connect(sentinel, path='/objects/{id}')
+    router.enable_miss_cache()
+    match = router.match(path=memoryview(b'/objects/12'))
+    assert match.target is sentinel
+    assert match.match_info == {'id': '12'}
+
+
+def test_path_router_decode_segments():
+    router = URIPathRouter(decode=True)
+    router.connect('menu', path='/café/{item}')
+    router.connect('files', path='/files/{*rest}')
+    assert router.match(path='/caf%C3%A9/cr%C3%AApe') == ('menu', {'item': 'crêpe'})
+    assert router.match(path=b'/files/a%20b/c') == ('files', {'*rest': ('a b', 'c')})
+
+
+def test_path_router_decode_after_dot_segments():
+    router = URIPathRouter(decode=True)
+    router.connect('dots', path='/a/{name}')
+    assert router.match(path='/a/%2E%2E') == ('dots', {'name': '..'})
+
+
+def test_path_router_decoded_slash_is_not_a_default_segment():
+    router = URIPathRouter(decode=True)
+    router.connect('item', path='/items/{name}')
+    router.connect('any', path='/any/{name:.+}')
+    try:
+        router.match(path='/items/a%2Fb')
+    except MatchError:
+        pass
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+    assert router.match(path='/any/a%2Fb').match_info == {'name': 'a/b'}
+
+
+def test_path_router_no_decode_by_default():
+    router = URIPathRouter()
+    router.connect('item', path='/items/{name}')
+    assert router.match(path='/items/a%20b').match_info == {'name': 'a%20b'}
+
+
+def test_path_router_url_for():
+    router = URIPathRouter()
+    router.connect('index', path='/', name='index')
+    router.connect('article', path=r'/articles/{category}/{id:\d+}/', name='article')
+    router.connect('files', path='/files/{*rest}', name='files')
+    assert router.url_for('index') == '/'
+    assert router.url_for('article', category='books', id=12) == '/articles/books/12'
+    assert router.url_for('files', rest=('a', 'b.txt')) == '/files/a/b.txt'
+    assert router.url_for('files', rest='a/b c') == '/files/a/b%20c'
+
+
+def test_path_router_url_for_round_trip():
+    router = URIPathRouter(decode=True)
+    router.connect('article', path='/articles/{category}/{id}', name='article')
+    url = router.url_for('article', category='crêpes & co', id='a/b')
+    assert url == '/articles/cr%C3%AApes%20&%20co/a%2Fb'
+    assert router.url_for('article', category='x', id=1) == '/articles/x/1'
+    url = router.url_for('article', category='crêpes & co', id='1')
+    assert router.match(path=url).match_info == {'category': 'crêpes & co', 'id': '1'}
+
+
+def test_path_router_url_for_dot_segments():
+    router = URIPathRouter(decode=True)
+    router.connect('root', path='/')
+    router.connect('item', path='/a/{b}', name='item')
+    router.connect('files', path='/files/{*rest}', name='files')
+    for value in ('.', '..'):
+        url = router.url_for('item', _validate=True, b=value)
+        assert url == '/a/' + value.replace('.', '%2E')
+        assert router.match(path=url) == ('item', {'b': value})
+    assert router.url_for('files', rest='../a') == '/files/%2E%2E/a'
+    assert router.match(path='/files/%2E%2E/a').match_info == {'*rest': ('..', 'a')}
+    assert router.url_for('item', b='...') == '/a/...'
+
+
+def test_path_router_url_for_validation():
+    router = URIPathRouter()
+    router.connect('article', path=r'/articles/{id:\d+}', name='article')
+    assert router.url_for('article', id='abc') == '/articles/abc'
+    try:
+        router.url_for('article', _validate=True, id='abc')
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError; no error raised.'
+
+
+def test_path_router_url_for_empty_values():
+    router = URIPathRouter()
+    router.connect('article', path='/articles/{id}', name='article')
+    router.connect('files', path='/files/{*rest}', name='files')
+    for name, params in (
+        ('files', {'rest': ''}), ('files', {'rest': []}), ('files', {'rest': 'a//b'}),
+        ('article', {'id': ''}),
+    ):
+        try:
+            router.url_for(name, **params)
+        except ValueError:
+            pass
+        else:
+            assert False, 'Expected ValueError; no error raised.'
+
+
+def test_path_router_url_for_missing_values():
+    router = URIPathRouter()
+    router.connect('article', path='/articles/{id}', name='article')
+    for name, params in (('article', {}), ('unknown', {'id': 1})):
+        try:
+            router.url_for(name, **params)
+        except KeyError:
+            pass
+        else:
+            assert False, 'Expected KeyError; no error raised.'
+
+
+def test_path_router_duplicate_route_name():
+    router = URIPathRouter()
+    router.connect('a', path='/a', name='route')
+    router.connect('a2', path='/a', name='route')
+    try:
+        router.connect('b', path='/b', name='route')
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError; no error raised.'
+
+
+def test_path_router_dump_load_route_names():
+    router = URIPathRouter()
+    router.connect(json.dumps, path='/objects/{id}', name='object')
+    buffer = io.StringIO()
+    router.dump(buffer)
+    buffer.seek(0)
+    assert URIPathRouter.load(buffer).url_for('object', id=3) == '/objects/3'
+
+
+def test_path_router_shared_prefixes():
+    router = URIPathRouter()
+    router.connect('b', path='/a/b')
+    router.connect('c', path='/a/c')
+    router.connect('d', path='/a/{x}/d')
+    router.connect('e', path='/a/{x}/e')
+    assert router.match(path='/a/b').target == 'b'
+    assert router.match(path='/a/c').target == 'c'
+    assert router.match(path='/a/z/d') == ('d', {'x': 'z'})
+    assert router.match(path='/a/z/e') == ('e', {'x': 'z'})
+
+
+def test_path_router_route_and_longer_route():
+    for paths in (('/a', '/a/b'), ('/a/b', '/a')):
+        router = URIPathRouter()
+        for path in paths:
+            router.connect(path, path=path)
+        assert router.match(path='/a').target == '/a'
+        assert router.match(path='/a/').target == '/a'
+        assert router.match(path='/a/b').target == '/a/b'
+
+
+def test_path_router_reconnect_replaces_handler():
+    router = URIPathRouter()
+    router.connect('first', path=r'/a/{id:\d+}')
+    router.connect('second', path=r'/a/{id:\d+}')
+    assert router.match(path='/a/1').target == 'second'
+    assert len(router.map.child('a').regex_segments) == 1
+
+
+def test_path_map_specificity_order():
+    mapping = PathMap()
+    mapping.set('{*rest}', 'glob')
+    mapping.set('{name}', 'default')
+    mapping.set(r'{id:\d+}', 'constrained')
+    mapping.set('static', 'static')
+    assert mapping.get('static') == ('static', None)
+    assert mapping.get('12') == ('constrained', 'id')
+    assert mapping.get('abc') == ('default', 'name')
+    assert [name for name, _ in mapping.regex_segments] == ['id', 'name', '*rest']
+
+
+def test_path_map_child():
+    mapping = PathMap()
+    mapping.set('plain', 'plain')
+    mapping.set(r'{id:\d+}', 'regex')
+    assert mapping.child('plain') == 'plain'
+    assert mapping.child(r'{id:\d+}') == 'regex'
+    assert mapping.child('{id}') is None
+    assert mapping.child('other') is None
+
+
+def test_path_router_validate():
+    router = URIPathRouter()
+    router.connect('new', path='/users/new')
+    router.connect('user', path='/users/{id}')
+    router.connect('member', path='/users/{member}/profile')
+    router.connect('files', path='/users/{*rest}')
+    router.connect('ok', path=r'/items/{id:\d+}')
+    conflicts = router.validate()
+    assert RouteConflict('overlap', '/users/new', 'also matched by {id}') in conflicts
+    assert RouteConflict('shadowed', '/users/{member}', 'always matched by {id}') in conflicts
+    assert RouteConflict('shadowed', '/users/{*rest}', 'always matched by {id}') in conflicts
+    assert len(conflicts) == 3
+
+
+def test_path_router_validate_regex_siblings():
+    router = URIPathRouter()
+    router.connect('edit', path='/{slug}/edit')
+    router.connect('history', path=r'/{id:\d+}/history')
+    assert router.validate() == [
+        RouteConflict('overlap', '/{slug}', r'also matched by {id:\d+}')
+    ]
+    try:
+        router.match(path='/123/edit')
+    except MatchError:
+        pass
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+
+    router = URIPathRouter()
+    router.connect('a', path='/{a:.+}')
+    router.connect('b', path='/{b:[a-z]+}')
+    router.connect('c', path='/{c:[0-9]+}/more')
+    assert router.validate() == [
+        RouteConflict('shadowed', '/{b:[a-z]+}', 'always matched by {a:.+}'),
+        RouteConflict('shadowed', '/{c:[0-9]+}', 'always matched by {a:.+}'),
+    ]
+
+
+def test_path_router_validate_no_conflicts():
+    router = URIPathRouter()
+    router.connect('user', path=r'/users/{id:\d+}')
+    router.connect('named', path='/users/{name}')
+    router.connect('files', path='/files/{*rest}')
+    router.connect('edit', path=r'/pages/{id:\d+}/edit')
+    router.connect('edit_named', path='/pages/{name}/edit')
+    router.connect('version', path=r'/versions/{version:v\d+}/notes')
+    router.connect('tag', path='/versions/{tag:[a-z]+}/files')
+    assert router.validate() == []
+
+
+def test_path_router_match_many_route_ends():
+    router = URIPathRouter()
+    router.connect('a', path='/a')
+    router.connect('ab', path='/a/b')
+    results = router.match_many([{'path': '/a'}, {'path': '/a/b'}])
+    assert [result.target for result in results] == ['a', 'ab']
+
+
+def test_path_router_backtracking_engine():
+    routes = [
+        ('history', r'/{id:\d+}/history'),
+        ('edit', '/{slug}/edit'),
+        ('glob', '/{*rest}'),
+        ('root', '/'),
+    ]
+    greedy = URIPathRouter()
+    backtracking = URIPathRouter(engine='backtracking')
+    for handler, path in routes:
+        greedy.connect(handler, path=path)
+        backtracking.connect(handler, path=path)
+
+    try:
+        greedy.match(path='/12/edit')
+    except MatchError:
+        pass
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+
+    match = backtracking.match(path='/12/edit')
+    assert match.target == 'edit'
+    assert match.match_info == {'slug': '12'}
+
+    match = backtracking.match(path='/12/history')
+    assert match.target == 'history'
+    assert match.match_info == {'id': '12'}
+
+    match = backtracking.match(path='/12/other/path')
+    assert match.target == 'glob'
+    assert match.match_info == {'*rest': ('12', 'other', 'path')}
+
+    assert backtracking.match(path='/').target == 'root'
+
+
+def test_path_router_backtracking_engine_miss():
+    router = URIPathRouter(engine='backtracking')
+    router.connect('history', path=r'/{id:\d+}/history')
+    router.connect('edit', path='/{slug}/edit')
+    for path in ('/', '/12', '/12/edit/more', '/12/other'):
+        try:
+            router.match(path=path)
+        except MatchError:
+            pass
+        except Exception as err:
+            assert False, 'Expected MatchError; %s raised.' % err.__class__.__name__
+        else:
+            assert False, 'Expected MatchError; no error raised.'
+
+
+def test_path_map_candidates():
+    mapping = PathMap()
+    mapping.set('12', 'plain')
+    mapping.set(r'{id:\d+}', 'number')
+    mapping.set('{name}', 'name')
+    assert list(mapping.candidates('12')) == [
+        ('plain', None), ('number', 'id'), ('name', 'name')
+    ]
+    assert list(mapping.candidates('abc')) == [('name', 'name')]
+
+
+def test_make_segment_filter():
+    assert make_segment_filter(r'v\d+') == SegmentFilter('v', '', 2, None)
+    assert make_segment_filter(r'.+\.json') == SegmentFilter('', '.json', 6, None)
+    assert make_segment_filter(r'\d{2,4}') == SegmentFilter('', '', 2, 4)
+    assert make_segment_filter('ab|ac') == SegmentFilter('a', '', 2, 2)
+    assert make_segment_filter(r'(?i)v\d') == SegmentFilter('', '', 2, 2)
+    assert make_segment_filter('[^/]+') == SegmentFilter('', '', 1, None)
+
+
+def test_merge_segment_filters():
+    filters = [make_segment_filter(r'v\d+'), make_segment_filter(r'v\d+\.json')]
+    assert merge_segment_filters(filters) == (('v',), ('',), 2, float('inf'))
+    filters.append(make_segment_filter('[^/]+'))
+    assert merge_segment_filters(filters) is None
+
+
+def test_make_regex_lookup_prefilter():
+    entries = [
+        ('version', re.compile(r'v\d+'), 'version'),
+        ('file', re.compile(r'v.+\.json'), 'file'),
+    ]
+    lookup = make_regex_lookup(entries)
+    assert lookup('v12') == ('version', 'version')
+    assert lookup('v1.json') == ('file', 'file')
+    assert lookup('users') is None
+    assert lookup('v') is None
+
+    # uncombinable patterns are filtered entry by entry
+    entries.append(('double', re.compile(r'(\w)\1x'), 'double'))
+    lookup = make_regex_lookup(entries)
+    assert lookup('v12') == ('version', 'version')
+    assert lookup('aax') == ('double', 'double')
+    assert lookup('abx') is None
+
+
+def test_path_router_connect_many():
+    router = URIPathRouter()
+    router.connect_many([
+        ('index', {'path': '/'}),
+        ('user', {'path': '/users/{id}', 'name': 'user'}),
+        ('number', {'path': r'/users/{id:\d+}'}),
+    ])
+    assert router.match(path='/').target == 'index'
+    assert router.match(path='/users/12').target == 'number'
+    assert router.match(path='/users/someone').target == 'user'
+    assert router.url_for('user', id='someone') == '/users/someone'
+
+
+def test_path_router_freeze():
+    for engine in URIPathRouter.engines:
+        router = URIPathRouter(engine=engine)
+        router.connect('user', path=r'/users/{id:\d+}')
+        router.connect('files', path='/files/{*rest}', name='files')
+        router.freeze()
+        assert router.frozen
+
+        assert router.map.plain_segments['users']._regex_lookup is not None
+        assert router.match(path='/users/12').target == 'user'
+        assert router.match(path='/files/a/b').match_info == {'*rest': ('a', 'b')}
+        assert router.url_for('files', rest='a/b') == '/files/a/b'
+
+        for connect in (
+            lambda: router.connect('other', path='/other'),
+            lambda: router.connect_many([('other', {'path': '/other'})]),
+        ):
+            try:
+                connect()
+            except TypeError:
+                pass
+            else:
+                assert False, 'Expected TypeError; no error raised.'
+
+        try:
+            router.map.plain_segments['other'] = 'other'
+        except TypeError:
+            pass
+        else:
+            assert False, 'Expected TypeError; no error raised.'
+
+
+def test_path_router_freeze_loaded_router():
+    router = URIPathRouter()
+    router.connect('tests.test_path_router:test_path_map', path=r'/items/{id:\d+}')
+    fp = io.StringIO()
+    router.dump(fp, reference=str)
+    fp.seek(0)
+    loaded = URIPathRouter.load(fp, resolve=str)
+    loaded.freeze()
+    (_, re_pattern), = loaded.map.plain_segments['items'].regex_segments
+    assert not isinstance(re_pattern, DeferredPattern)
+    assert loaded.match(path='/items/3').match_info == {'id': '3'}
+
+
+def test_path_router_connect_publishes_routes():
+    router = URIPathRouter()
+    router.connect('user', path='/users/{id}')
+    router.connect('item', path='/items/{id}')
+    before = router.map
+    users = before.plain_segments['users']
+    items = before.plain_segments['items']
+
+    # plain segments are added in place, once the new branch is built
+    router.connect('new', path='/new/a/b')
+    assert router.map is before
+    assert router.map.plain_segments['new'].plain_segments['a'].plain_segments['b'] == 'new'
+
+    # nodes whose parameterized segments change are replaced by copies
+    router.connect('profile', path='/users/{id}/profile')
+    assert router.map is before
+    assert router.map.plain_segments['items'] is items
+    assert router.map.plain_segments['users'] is not users
+    assert users.get('12') == ('user', 'id')
+    assert router.match(path='/users/12/profile').target == 'profile'
+    assert router.match(path='/users/12').target == 'user'
+
+    router.connect('root_param', path='/{lang}')
+    assert router.map is not before
+    assert router.match(path='/en').target == 'root_param'
+    assert router.match(path='/new/a/b').target == 'new'
+
+
+def test_path_router_connect_many_is_atomic():
+    router = URIPathRouter()
+    router.connect('index', path='/')
+    before = router.map
+    try:
+        router.connect_many([
+            ('a', {'path': '/a'}),
+            ('bad', {'path': '/{*rest}/b'}),
+        ])
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError; no error raised.'
+    assert router.map is before
+    try:
+        router.match(path='/a')
+    except MatchError:
+        pass
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+
+
+def test_path_router_disconnect():
+    router = URIPathRouter()
+    router.connect('a', path='/a')
+    router.connect('ab', path='/a/b', name='ab')
+    router.connect('number', path=r'/n/{id:\d+}')
+    router.connect('name', path='/n/{name}')
+
+    router.disconnect(path='/a/b')
+    assert router.map.plain_segments['a'] == 'a'
+    assert router.match(path='/a').target == 'a'
+    try:
+        router.url_for('ab')
+    except KeyError:
+        pass
+    else:
+        assert False, 'Expected KeyError; no error raised.'
+
+    router.disconnect(path=r'/n/{id:\d+}')
+    assert router.match(path='/n/12').match_info == {'name': '12'}
+    router.disconnect(path='/n/{name}')
+    assert 'n' not in router.map.plain_segments
+
+    for path in ('/a/b', '/missing', '/n/{name}'):
+        try:
+            router.disconnect(path=path)
+        except KeyError:
+            pass
+        else:
+            assert False, 'Expected KeyError; no error raised.'
+
+
+def test_path_router_disconnect_keeps_longer_routes():
+    router = URIPathRouter()
+    router.connect('a', path='/a')
+    router.connect('ab', path='/a/b')
+    router.disconnect(path='/a')
+    assert router.match(path='/a/b').target == 'ab'
+    try:
+        router.match(path='/a')
+    except MatchError:
+        pass
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+
+
+def test_path_router_miss_cache_kept_when_other_routers_change():
+    router = URIPathRouter()
+    router.connect('a', path='/a')
+    miss_cache = router.enable_miss_cache()
+    for _ in range(2):
+        try:
+            router.match(path='/b')
+        except MatchError:
+            pass
+        else:
+            assert False, 'Expected MatchError; no error raised.'
+        HTTPMethodRouter().connect('get', method='GET')
+    assert miss_cache.recorded == 1
+    assert miss_cache.short_circuited == 1
+
+
+def test_path_router_concurrent_updates():
+    for engine in URIPathRouter.engines:
+        router = URIPathRouter(engine=engine)
+        router.connect('static', path='/static/{*path}')
+        router.connect('kept', path='/items/{id}/kept')
+        errors = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                try:
+                    assert router.match(path='/static/a/b').target == 'static'
+                    assert router.match(path='/items/1/kept').target == 'kept'
+                except Exception as err:
+                    errors.append(err)
+                    return
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for i in range(200):
+            router.connect(i, path='/items/{id}/v%d/{name:\\w+}' % i)
+            router.connect(i, path='/plain%d/a/b' % i)
+            router.connect(i, path='/items/{id}/{v%d:z%d}' % (i, i))
+            if i % 2:
+                router.disconnect(path='/items/{id}/v%d/{name:\\w+}' % (i - 1))
+        done.set()
+        for reader in readers:
+            reader.join()
+        assert errors == []
+        assert router.match(path='/plain199/a/b').target == 199
+        assert router.match(path='/items/1/v199/x').target == 199
+        assert router.match(path='/items/1/z199').target == 199
+
+
+def test_segments_disjoint():
+    assert segments_disjoint(r'v\d+', r'\d+')
+    assert segments_disjoint(r'\d+', '[a-z]+')
+    assert segments_disjoint(r'\d{4}', r'\d{2}')
+    assert segments_disjoint(r'.+\.json', r'.+\.xml')
+    assert not segments_disjoint(r'\d+', '[^/]+')
+    assert not segments_disjoint(r'\d+', r'\w+')
+    assert not segments_disjoint('(?i)a', 'A')
+
+
+def test_order_by_hits():
+    patterns = [r'\d+', '[a-z]+', r'\w+']
+    assert order_by_hits(patterns, [1, 5, 10]) == [1, 0, 2]
+    assert order_by_hits(patterns, [0, 0, 0]) == [0, 1, 2]
+
+
+def test_path_router_optimize():
+    router = URIPathRouter()
+    router.connect('number', path=r'/items/{id:\d+}')
+    router.connect('version', path=r'/items/{version:v\d+}')
+    router.connect('word', path=r'/items/{word:\w+}')
+    router.connect('other', path='/other')
+    other = router.map.plain_segments['other']
+
+    assert router.optimize(['/items/12', '/other']) == 0
+    assert router.optimize(['/items/v1', '/items/v2', '/items/12']) == 1
+    items = router.map.plain_segments['items']
+    assert [name for name, _ in items.regex_segments] == ['version', 'id', 'word']
+    assert router.map.plain_segments['other'] is other
+    assert router.match(path='/items/12').target == 'number'
+    assert router.match(path='/items/v1').target == 'version'
+    assert router.match(path='/items/x').target == 'word'
+
+
+def test_path_router_optimize_with_instrumentation():
+    router = URIPathRouter()
+    router.connect('number', path=r'/a/{id:\d+}/b')
+    router.connect('name', path='/a/{name:[a-z]+}/b')
+    instrumentation = router.enable_instrumentation()
+    for _ in range(3):
+        router.match(path='/a/x/b')
+    router.disable_instrumentation()
+    assert router.optimize(instrumentation) == 1
+    assert [name for name, _ in router.map.plain_segments['a'].regex_segments] == ['name', 'id']
+    assert router.match(path='/a/1/b').target == 'number'
+
+
+def test_path_router_try_match():
+    router = URIPathRouter()
+    methods = HTTPMethodRouter()
+    methods.connect('get_item', method='GET')
+    router.connect(methods, path='/items/{id}')
+    router.connect('a', path='/a/b')
+
+    match = router.try_match(path='/items/1', method='GET')
+    assert match == router.match(path='/items/1', method='GET')
+
+    for kwargs, reason, miss_router in (
+        ({'path': '/missing'}, 'no_segment', router),
+        ({'path': '/a'}, 'partial_path', router),
+        ({'path': '/items/1', 'method': 'PUT'}, 'method_not_allowed', methods),
+    ):
+        miss = router.try_match(**kwargs)
+        assert not miss
+        assert miss.reason == reason
+        assert miss.router is miss_router
+        assert miss.kwargs == kwargs
+
+
+def test_path_router_try_match_none_handler():
+    router = URIPathRouter()
+    router.connect(None, path='/none')
+    assert router.try_match(path='/none').target is None
+
+
+def test_path_router_miss_is_not_chained():
+    router = URIPathRouter()
+    try:
+        router.match(path='/missing')
+    except MatchError as err:
+        assert err.__cause__ is None
+        assert err.__context__ is None
+        assert err._pyger['reason'] == 'no_segment'
+    else:
+        assert False, 'Expected MatchError; no error raised.'
+
+
+def test_path_map_pickle_round_trip():
+    mapping = PathMap()
+    mapping.set('users', 'users')
+    mapping.set('{id:\\d+}', 'item')
+    mapping.set('{slug}', PathMap())
+    assert mapping.get('12') == ('item', 'id')  # builds the regex lookup
+
+    for loaded in (pickle.loads(pickle.dumps(mapping)), copy.deepcopy(mapping)):
+        assert loaded.get('users') == ('users', None)
+        assert loaded.get('12') == ('item', 'id')
+        assert isinstance(loaded.get('abc')[0], PathMap)
+        empty = loaded.get('abc')[0]
+        assert empty.plain_segments is mapping.get('abc')[0].plain_segments
+
+    deferred = pickle.loads(pickle.dumps(DeferredPattern('[a-z]+')))
+    assert deferred.fullmatch('abc')
+
+    mapping.freeze()
+    loaded = pickle.loads(pickle.dumps(mapping))
+    assert loaded.get('12') == ('item', 'id')
+    try:
+        loaded.set('other', 'value')
+    except TypeError:
+        pass
+    else:
+        assert False, 'Expected TypeError; no error raised.'
+
+
+def test_path_map_regex_definitions_by_source():
+    mapping = PathMap()
+    mapping.set('{id:\\d+}', 'digits')
+    mapping.set('{id}', 'default')
+    mapping.set('{id:\\d+}', 'replaced')
+    assert len(mapping.regex_segments) == 2
+    copied = mapping.copy()
+    copied.set('{id:[a-z]+}', 'letters')
+    assert mapping.child('{id:[a-z]+}') is None
+    assert copied.child('{id:\\d+}') == 'replaced'
+    copied.remove('{id:\\d+}')
+    assert copied.child('{id:\\d+}') is None
+    assert mapping.child('{id:\\d+}') == 'replaced'
+    assert copied.get('12') == ('default', 'id')
+    assert copied.get('ab') == ('letters', 'id')
+
+
+def test_path_router_pickle_round_trip():
+    for engine in URIPathRouter.engines:
+        router = URIPathRouter(engine=engine)
+        router.connect('user', path=r'/users/{id:\d+}', name='user')
+        router.connect('files', path='/files/{*rest}')
+        router.match(path='/users/1')  # builds lookups
+        for loaded in (pickle.loads(pickle.dumps(router)), copy.deepcopy(router)):
+            assert loaded.match(path='/users/1') == ('user', {'id': '1'})
+            assert loaded.url_for('user', id=2) == '/users/2'
+            loaded.connect('item', path='/items/{id}')
+            assert loaded.match(path='/items/1').target == 'item'
+            assert router.try_match(path='/items/1').reason == 'no_segment'
+
+    router.freeze()
+    loaded = pickle.loads(pickle.dumps(router))
+    assert loaded.frozen
+    assert loaded.match(path='/files/a/b').match_info == {'*rest': ('a', 'b')}
+    try:
+        loaded.connect('item', path='/items/{id}')
+    except TypeError:
+        pass
+    else:
+        assert False, 'Expected TypeError; no error raised.'
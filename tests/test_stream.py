@@ -0,0 +1,114 @@
+from pyger.base import MatchError
+from pyger.routers import URIPathRouter
+from pyger.stream import aroute, route
+import asyncio
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def make_router():
+    router = URIPathRouter()
+    router.connect('item', path='/items/{id}')
+    return router
+
+
+def test_route_yields_results_in_order():
+    requests = [{'path': '/items/1'}, {'path': '/nope'}, {'path': '/items/2'}]
+    pairs = list(route(make_router(), requests, buffer_size=2))
+    assert [request for request, _ in pairs] == requests
+    assert pairs[0][1] == ('item', {'id': '1'})
+    assert isinstance(pairs[1][1], MatchError)
+    assert pairs[2][1] == ('item', {'id': '2'})
+
+
+def test_route_is_lazy():
+    consumed = []
+
+    def requests():
+        for i in range(10):
+            consumed.append(i)
+            yield {'path': '/items/%d' % i}
+
+    stream = route(make_router(), requests(), buffer_size=3)
+    next(stream)
+    assert consumed == [0, 1, 2]
+
+
+def test_route_custom_kwargs():
+    messages = ['/items/1', '/items/2']
+    pairs = list(route(make_router(), messages, get_kwargs=lambda path: {'path': path}))
+    assert [result.match_info['id'] for _, result in pairs] == ['1', '2']
+
+
+def test_route_invalid_buffer_size():
+    try:
+        next(route(make_router(), [], buffer_size=0))
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected ValueError; no error raised.'
+
+
+async def collect(stream):
+    return [pair async for pair in stream]
+
+
+def test_aroute_async_source():
+    async def requests():
+        for i in range(5):
+            await asyncio.sleep(0)
+            yield {'path': '/items/%d' % i}
+
+    pairs = run(collect(aroute(make_router(), requests(), buffer_size=2)))
+    assert [result.match_info['id'] for _, result in pairs] == ['0', '1', '2', '3', '4']
+
+
+def test_aroute_sync_source():
+    requests = [{'path': '/items/1'}, {'path': '/nope'}]
+    pairs = run(collect(aroute(make_router(), requests)))
+    assert pairs[0][1].target == 'item'
+    assert isinstance(pairs[1][1], MatchError)
+
+
+def test_aroute_backpressure():
+    produced = []
+
+    async def requests():
+        for i in range(100):
+            produced.append(i)
+            yield {'path': '/items/%d' % i}
+
+    async def take_one():
+        stream = aroute(make_router(), requests(), buffer_size=4)
+        await stream.__anext__()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await stream.aclose()
+        return len(produced)
+
+    # one batch of at most 4 was consumed, and at most 4 more can be queued
+    assert run(take_one()) <= 9
+
+
+def test_aroute_source_error():
+    async def requests():
+        yield {'path': '/items/1'}
+        raise RuntimeError('source failed')
+
+    async def consume():
+        seen = []
+        try:
+            async for pair in aroute(make_router(), requests()):
+                seen.append(pair)
+        except RuntimeError:
+            return seen
+        assert False, 'Expected RuntimeError; no error raised.'
+
+    assert len(run(consume())) == 1